@@ -0,0 +1,98 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Etablissement, Faculte, Domaine, Specialite
+
+
+TREE_CACHE_KEY = 'academic:tree:v2'
+ETAG_CACHE_KEY = 'academic:tree:v2:etag'
+
+# Process-local copy of the tree, revalidated against the shared cache by ETag
+_local = {'tree': None}
+
+
+def _timeout():
+    return getattr(settings, 'ACADEMIC_TREE_CACHE_TIMEOUT', 3600)
+
+
+def _tree_querysets():
+    return {
+        'etablissements': Etablissement.objects.values_list('id', 'nom'),
+        'facultes': Faculte.objects.values_list('id', 'nom', 'etablissement_id'),
+        'domaines': Domaine.objects.values_list('id', 'nom', 'faculte_id'),
+        'specialites': Specialite.objects.values_list('id', 'nom', 'domaine_id'),
+    }
+
+
+def _tree(data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return {
+        'data': data,
+        # For membership checks without scanning the rows
+        'ids': {kind: frozenset(row[0] for row in rows) for kind, rows in data.items()},
+        'payload': payload,
+        'etag': hashlib.sha256(payload.encode()).hexdigest()[:32],
+        'last_modified': timezone.now().replace(microsecond=0),
+    }
+
+
+def _build_tree():
+    return _tree({key: list(rows) for key, rows in _tree_querysets().items()})
+
+
+def get_tree():
+    """Return the whole Etablissement→Faculte→Domaine→Specialite hierarchy.
+
+    The result is a dict with the row ``data`` (lists of ``[id, nom, parent_id]``),
+    the ``ids`` of each kind as frozensets, its compact JSON ``payload``, an ``etag`` and a ``last_modified`` date. It is
+    shared through the Django cache and kept in process memory, so a request
+    only reads the small ETag key while the tree is unchanged. Model signals
+    drop it with ``invalidate_tree()``; other processes only notice through
+    the cache, which must therefore be shared (see ``CACHES``). Changes the
+    signals miss (bulk ``update()``, raw SQL, ``loaddata``) show up once the
+    entries expire after ``ACADEMIC_TREE_CACHE_TIMEOUT`` seconds.
+    """
+    etag = cache.get(ETAG_CACHE_KEY)
+    tree = _local['tree']
+    if etag is not None and tree is not None and tree['etag'] == etag:
+        return tree
+    tree = cache.get(TREE_CACHE_KEY)
+    if tree is None or tree['etag'] != etag:
+        tree = _build_tree()
+        cache.set_many({TREE_CACHE_KEY: tree, ETAG_CACHE_KEY: tree['etag']}, _timeout())
+    _local['tree'] = tree
+    return tree
+
+
+def invalidate_tree():
+    cache.delete_many([TREE_CACHE_KEY, ETAG_CACHE_KEY])
+    _local['tree'] = None
+
+
+def facultes(tree=None):
+    return [{'id': pk, 'nom': nom} for pk, nom, _ in (tree or get_tree())['data']['facultes']]
+
+
+def domaines(faculte_id=None, tree=None):
+    return [
+        {'id': pk, 'nom': nom, 'faculte_id': parent_id}
+        for pk, nom, parent_id in (tree or get_tree())['data']['domaines']
+        if not faculte_id or str(parent_id) == str(faculte_id)
+    ]
+
+
+def specialites(domaine_id=None, tree=None):
+    return [
+        {'id': pk, 'nom': nom, 'domaine_id': parent_id}
+        for pk, nom, parent_id in (tree or get_tree())['data']['specialites']
+        if not domaine_id or str(parent_id) == str(domaine_id)
+    ]
+
+
+def contains(kind, pk, tree=None):
+    """Whether ``pk`` is the id of a row of ``kind`` (``'facultes'``, ``'domaines'``...)."""
+    return pk in (tree or get_tree())['ids'][kind]
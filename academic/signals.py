@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .hierarchy import invalidate_tree
+from .models import Etablissement, Faculte, Domaine, Specialite
+
+
+@receiver([post_save, post_delete], sender=Etablissement)
+@receiver([post_save, post_delete], sender=Faculte)
+@receiver([post_save, post_delete], sender=Domaine)
+@receiver([post_save, post_delete], sender=Specialite)
+def academic_changed(sender, **kwargs):
+    invalidate_tree()
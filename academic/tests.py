@@ -1,3 +1,52 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from . import hierarchy
+from .models import Domaine, Faculte, Specialite
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class HierarchyTreeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculte = Faculte.objects.create(nom='Sciences')
+        cls.domaine = Domaine.objects.create(nom='Informatique', faculte=cls.faculte)
+
+    def setUp(self):
+        cache.clear()
+        hierarchy.invalidate_tree()
+
+    def test_tree_is_served_from_the_cache(self):
+        with self.assertNumQueries(4):
+            tree = hierarchy.get_tree()
+        with self.assertNumQueries(0):
+            self.assertIs(hierarchy.get_tree(), tree)
+        # Another process finds it in the shared cache
+        hierarchy._local['tree'] = None
+        with self.assertNumQueries(0):
+            self.assertEqual(hierarchy.get_tree()['etag'], tree['etag'])
+
+    def test_changes_invalidate_the_tree(self):
+        etag = hierarchy.get_tree()['etag']
+        specialite = Specialite.objects.create(nom='Génie logiciel', domaine=self.domaine)
+        self.assertTrue(hierarchy.contains('specialites', specialite.pk))
+
+        self.faculte.nom = 'Sciences exactes'
+        self.faculte.save()
+        self.assertEqual(hierarchy.facultes(), [{'id': self.faculte.pk, 'nom': 'Sciences exactes'}])
+
+        specialite.delete()
+        self.assertFalse(hierarchy.contains('specialites', specialite.pk))
+        self.assertNotEqual(hierarchy.get_tree()['etag'], etag)
+
+    def test_unchanged_tree_is_not_resent(self):
+        response = self.client.get('/api/academic-tree/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['domaines'], [[self.domaine.pk, 'Informatique', self.faculte.pk]])
+        response = self.client.get('/api/academic-tree/', HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        Domaine.objects.create(nom='Mathématiques', faculte=self.faculte)
+        response = self.client.get('/api/academic-tree/', HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
@@ -59,6 +59,15 @@ cd $DEPLOY_DIR
 source venv/bin/activate
 python manage.py collectstatic --noinput
 
+# The shared cache (see CACHES in settings.py)
+if ! command -v redis-server > /dev/null; then
+    echo "Installing Redis..."
+    apt-get install -y redis-server
+fi
+systemctl enable --now redis-server
+# Table of the database cache fallback, harmless when Redis is used
+python manage.py createcachetable
+
 
 # Set appropriate permissions
 echo "Setting file permissions..."
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Form, FormField, FormSubmission, FormAnswer, UploadedFile
+from django.db import transaction
+from .models import Form, FormField, FormSubmission, FormAnswer, UploadedFile, ExportJob
+from .counters import record_change, record_deletion
+from .schema import bump_schema_version
 
 
 class FormFieldInline(admin.TabularInline):
@@ -16,6 +19,10 @@ class FormAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     inlines = [FormFieldInline]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        bump_schema_version(form.instance)
+
 
 @admin.register(FormField)
 class FormFieldAdmin(admin.ModelAdmin):
@@ -23,6 +30,15 @@ class FormFieldAdmin(admin.ModelAdmin):
     list_filter = ['field_type', 'is_required']
     search_fields = ['label', 'name']
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_schema_version(obj.form)
+
+    def delete_model(self, request, obj):
+        form = obj.form
+        super().delete_model(request, obj)
+        bump_schema_version(form)
+
 
 class FormAnswerInline(admin.TabularInline):
     model = FormAnswer
@@ -37,8 +53,33 @@ class FormSubmissionAdmin(admin.ModelAdmin):
     search_fields = ['form__title']
     inlines = [FormAnswerInline]
 
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        old = FormSubmission.objects.filter(pk=obj.pk).values_list('form_id', 'status').first() if change else None
+        super().save_model(request, obj, form, change)
+        if old:
+            record_change(*old, obj)
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        record_deletion([(obj.form_id, obj.status)])
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        deleted = list(queryset.values_list('form_id', 'status'))
+        super().delete_queryset(request, queryset)
+        record_deletion(deleted)
+
 
 @admin.register(UploadedFile)
 class UploadedFileAdmin(admin.ModelAdmin):
     list_display = ['original_filename', 'submission', 'content_type', 'size_bytes', 'uploaded_at']
     list_filter = ['content_type', 'uploaded_at']
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'form', 'export_format', 'status', 'rows_done', 'rows_total', 'created_at', 'finished_at']
+    list_filter = ['status', 'export_format', 'created_at']
+    readonly_fields = ['cache_key', 'rows_done', 'rows_total', 'started_at', 'finished_at', 'error']
@@ -0,0 +1,366 @@
+"""Helpers shared by the ``benchmark`` management command."""
+import math
+import queue
+import resource
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import Client
+
+from academic import hierarchy
+
+from .counters import reconcile_counters
+from .management.commands.seed_inscription_form import INSCRIPTION_FIELDS
+from .models import Form, FormField, FormSubmission, FormAnswer, FormStatus, FormAccess, FormType, FieldType
+from .schema import ACADEMIC_COLUMNS
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (``pct`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies):
+    """Return latency statistics in milliseconds."""
+    total = sum(latencies)
+    return {
+        'count': len(latencies),
+        'mean_ms': round(total / len(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook counting statements by SQL verb."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        verb = sql.lstrip().split(' ', 1)[0].upper()
+        self.counts[verb] = self.counts.get(verb, 0) + 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def get(self, verb):
+        return self.counts.get(verb, 0)
+
+
+class StatementTimer:
+    """``connection.execute_wrapper`` hook timing the statements that start with ``prefix``."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.durations = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().startswith(self.prefix):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations.append(time.perf_counter() - start)
+
+
+def timed(func, *args, **kwargs):
+    """Run ``func`` and return ``(elapsed_seconds, QueryCounter, result)``."""
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    return elapsed, counter, result
+
+
+def fetch(url):
+    """GET ``url`` over HTTP and return ``(elapsed_seconds, status_code)``."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return time.perf_counter() - start, status
+
+
+def run_concurrently(func, jobs, workers):
+    """Call ``func(job)`` for every job on ``workers`` threads.
+
+    Results are returned in job order. Each worker closes its own database
+    connections once the queue is drained. The first exception raised by a
+    job is re-raised once every worker has stopped.
+    """
+    jobs = list(jobs)
+    results = [None] * len(jobs)
+    errors = []
+    pending = queue.Queue()
+    for item in enumerate(jobs):
+        pending.put(item)
+
+    def worker():
+        try:
+            while not errors:
+                try:
+                    index, job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                results[index] = func(job)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(min(workers, len(jobs)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def create_benchmark_form(user, field_count):
+    """Create a published public form with ``field_count`` text-like fields.
+
+    Its rate limit is off: every benchmark client submits from the same address.
+    """
+    form = Form.objects.create(
+        title='Benchmark form',
+        status=FormStatus.PUBLISHED,
+        access_level=FormAccess.PUBLIC,
+        submission_rate=0,
+        created_by=user,
+    )
+    cycle = [FieldType.TEXT, FieldType.NUMBER, FieldType.EMAIL, FieldType.DATE, FieldType.TEXTAREA]
+    FormField.objects.bulk_create([
+        FormField(
+            form=form,
+            name=f'field_{i}',
+            label=f'Field {i}',
+            field_type=cycle[i % len(cycle)],
+            order=i,
+        )
+        for i in range(1, field_count + 1)
+    ])
+    return form
+
+
+def _option_values(field):
+    return [
+        str(option.get('value', '')) if isinstance(option, dict) else str(option)
+        for option in field.options_json or ()
+    ] or ['']
+
+
+def sample_value(field, seed):
+    """A valid ``value_text`` answer to ``field``; FILE fields get a fake stored name."""
+    if field.field_type == FieldType.NUMBER:
+        return str(seed % 20)
+    elif field.field_type == FieldType.EMAIL:
+        return f'user{seed}@example.com'
+    elif field.field_type == FieldType.DATE:
+        return '2000-01-%02d' % (seed % 28 + 1)
+    elif field.field_type == FieldType.TIME:
+        return '%02d:00' % (seed % 24)
+    elif field.field_type == FieldType.PHONE:
+        return '05%08d' % (seed % 10 ** 8)
+    elif field.field_type == FieldType.URL:
+        return f'https://example.com/{seed}'
+    elif field.field_type in (FieldType.SELECT, FieldType.RADIO, FieldType.CHECKBOX):
+        values = _option_values(field)
+        return values[seed % len(values)]
+    elif field.field_type in ACADEMIC_COLUMNS:
+        rows = hierarchy.get_tree()['data'][ACADEMIC_COLUMNS[field.field_type][1]]
+        return str(rows[seed % len(rows)][0]) if rows else ''
+    elif field.field_type == FieldType.HIDDEN:
+        return field.default_value
+    elif field.field_type == FieldType.FILE:
+        return f'{seed:064x}.pdf'
+    return f'Answer {seed} for {field.name}'
+
+
+def sample_post_data(fields, seed):
+    """Build POST data answering every field of ``fields``, with a small upload for FILE fields."""
+    data = {}
+    for field in fields:
+        if field.field_type == FieldType.PANEL:
+            continue
+        elif field.field_type == FieldType.FILE:
+            data[f'field_{field.id}'] = SimpleUploadedFile(
+                f'piece_{seed}.pdf', f'%PDF-1.4 benchmark {seed}'.encode(), 'application/pdf'
+            )
+        else:
+            data[f'field_{field.id}'] = sample_value(field, seed)
+    return data
+
+
+def create_inscription_forms(user, count, field_count):
+    """Create ``count`` published copies of the inscription form with ``field_count`` fields each.
+
+    Fields cycle through ``seed_inscription_form``'s fields, suffixing the
+    names of repeats.
+    """
+    forms = []
+    for index in range(count):
+        form = Form.objects.create(
+            title=f'Benchmark inscription {index + 1}',
+            status=FormStatus.PUBLISHED,
+            access_level=FormAccess.AUTHENTICATED,
+            form_type=FormType.REGISTRATION,
+            single_submission=True,
+            allow_update=True,
+            created_by=user,
+        )
+        fields = []
+        for order in range(field_count):
+            template = INSCRIPTION_FIELDS[order % len(INSCRIPTION_FIELDS)]
+            lap = order // len(INSCRIPTION_FIELDS)
+            fields.append(FormField(
+                form=form, order=order + 1,
+                **{**template, 'name': f"{template['name']}_{lap + 1}" if lap else template['name']},
+            ))
+        FormField.objects.bulk_create(fields)
+        forms.append(form)
+    return forms
+
+
+def create_students(count, prefix='benchmark-student'):
+    """Create ``count`` users without a usable password."""
+    return User.objects.bulk_create([
+        User(username=f'{prefix}-{uuid.uuid4().hex[:12]}', password=make_password(None))
+        for _ in range(count)
+    ])
+
+
+def logged_in_client(user):
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(user)
+    return client
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process, in kilobytes (Linux reports kilobytes)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+        response.close()
+    return response
+
+
+def measure(request, jobs, workers, expected_status=200, statements=None):
+    """Call ``request(job)`` for every job on ``workers`` threads and summarize the responses.
+
+    Streaming responses are read to the end within the timing. Requests
+    answered with another status than ``expected_status`` count as errors.
+    The latencies of the statements selected by a ``StatementTimer`` are
+    added as ``statements``.
+    """
+    def run(job):
+        if statements is None:
+            elapsed, counter, response = timed(lambda: _consume(request(job)))
+        else:
+            with connection.execute_wrapper(statements):
+                elapsed, counter, response = timed(lambda: _consume(request(job)))
+        return elapsed, counter.total, response.status_code
+
+    start = time.perf_counter()
+    results = run_concurrently(run, jobs, workers)
+    wall = time.perf_counter() - start
+    queries = [total for _, total, _ in results]
+    summary = {
+        'requests': len(results),
+        'throughput_rps': round(len(results) / wall, 2),
+        'latency': summarize([elapsed for elapsed, _, _ in results]),
+        'queries_per_request': {'mean': round(sum(queries) / len(queries), 2), 'max': max(queries)},
+        'errors': sum(1 for _, _, status in results if status != expected_status),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+    if statements is not None:
+        summary['statements'] = summarize(statements.durations)
+    return summary
+
+
+def _metrics(result, path=''):
+    """Flatten the numeric leaves of a benchmark result into ``{dotted.path: value}``."""
+    if isinstance(result, dict):
+        metrics = {}
+        for key, value in result.items():
+            metrics.update(_metrics(value, f'{path}.{key}' if path else key))
+        return metrics
+    if isinstance(result, (int, float)) and not isinstance(result, bool):
+        return {path: result}
+    return {}
+
+
+def _higher_is_better(path):
+    name = path.rsplit('.', 1)[-1]
+    if name == 'max_ms':
+        return None  # a single outlier, too noisy to compare
+    if 'throughput' in name:
+        return True
+    if name.endswith(('_ms', '_kb')) or 'queries' in path or name == 'errors':
+        return False
+    return None
+
+
+def compare(baseline, current, threshold=10.0):
+    """Compare two benchmark results metric by metric.
+
+    Returns ``(path, before, after, change_percent, regressed)`` rows for the
+    metrics present in both results whose direction is known: throughput
+    should go up; latency, query counts, memory and errors should go down.
+    A metric regresses when it moves the wrong way by more than
+    ``threshold`` percent.
+    """
+    before, after = _metrics(baseline), _metrics(current)
+    rows = []
+    for path, old in before.items():
+        better_up = _higher_is_better(path)
+        if path not in after or better_up is None:
+            continue
+        new = after[path]
+        change = (new - old) / old * 100 if old else (0.0 if new == old else math.inf)
+        worse = -change if better_up else change
+        rows.append((path, old, new, round(change, 1), worse > threshold))
+    return rows
+
+
+def seed_submissions(form, fields, count, batch_size=1000):
+    """Bulk insert ``count`` answered submissions for ``form``."""
+    fields = [field for field in fields if field.field_type != FieldType.PANEL]
+    for offset in range(0, count, batch_size):
+        submissions = FormSubmission.objects.bulk_create([
+            FormSubmission(form=form, ip_address='127.0.0.1')
+            for _ in range(min(batch_size, count - offset))
+        ])
+        FormAnswer.objects.bulk_create([
+            FormAnswer(submission=submission, field=field, value_text=value)
+            for seed, submission in enumerate(submissions, offset)
+            for field in fields
+            for value in [sample_value(field, seed)]
+        ], batch_size=batch_size)
+    reconcile_counters(Form.objects.filter(pk=form.pk))
@@ -0,0 +1,149 @@
+"""Field edits made in the form builder, applied in bulk."""
+from django.db import transaction
+from django.db.models import Max
+
+from .models import FormField
+from .schema import bump_schema_version
+from .validation import rules_error
+
+
+# Builder JSON keys copied as is onto FormField attributes
+FIELD_ATTRIBUTES = (
+    'label', 'field_type', 'is_required', 'placeholder', 'default_value', 'options_json',
+    'validation_json', 'visible_condition', 'enabled_condition', 'admin_only', 'icon', 'background_color',
+)
+
+
+def parse_field_ids(values):
+    """``values`` as a list of field ids; ``ValueError`` unless each one is an integer (or its string)."""
+    if not isinstance(values, list):
+        raise ValueError('field_ids must be a list.')
+    try:
+        return [parse_field_id(value) for value in values]
+    except ValueError:
+        raise ValueError('field_ids must be a list of field ids.') from None
+
+
+def parse_field_id(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'Invalid field id {value!r}.')
+    return int(value)
+
+
+def apply_field_data(field, data):
+    """Copy the builder's JSON ``data`` onto ``field`` and return the names of the changed attributes.
+
+    Absent keys leave the attribute unchanged. Raises ``ValueError`` for a
+    malformed ``validation_json`` or ``parent_field_id``.
+    """
+    error = rules_error(data['validation_json']) if 'validation_json' in data else None
+    if error:
+        raise ValueError(error)
+    changed = []
+    if 'name' in data:
+        field.name = data['name'].replace(' ', '_').lower()
+        changed.append('name')
+    for attribute in FIELD_ATTRIBUTES:
+        if attribute in data:
+            setattr(field, attribute, data[attribute])
+            changed.append(attribute)
+    if 'parent_field_id' in data:
+        field.parent_field_id = parse_field_id(data['parent_field_id']) if data['parent_field_id'] else None
+        changed.append('parent_field')
+    return changed
+
+
+def next_order(form):
+    return (form.fields.aggregate(Max('order'))['order__max'] or 0) + 1
+
+
+def reorder(form, field_ids):
+    """Number the fields of ``form`` in ``field_ids`` order with a single UPDATE.
+
+    Ids may be posted as strings; raises ``ValueError`` for anything else.
+    """
+    field_ids = parse_field_ids(field_ids)
+    fields = list(form.fields.filter(pk__in=field_ids).only('pk', 'order'))
+    position = {field_id: index for index, field_id in enumerate(field_ids)}
+    for field in fields:
+        field.order = position[field.pk]
+    FormField.objects.bulk_update(fields, ['order'])
+
+
+def _field_data(operation):
+    data = operation.get('data', {})
+    if not isinstance(data, dict):
+        raise ValueError('Operation data must be an object.')
+    return data
+
+
+def apply_operations(form, operations):
+    """Apply a list of builder operations to the fields of ``form`` in one transaction.
+
+    Each operation is a dict with an ``op`` of ``add`` (with ``data``),
+    ``update`` (``id`` and ``data``), ``delete`` (``id``) or ``reorder``
+    (``field_ids``). They are applied in memory in order, then written with at
+    most one DELETE, one bulk UPDATE and one INSERT, and the schema version is
+    bumped once. Returns the new schema version and the ids of the added fields.
+    Raises ``ValueError`` for an invalid operation, including a parent field
+    that is not on the form once the batch is applied; nothing is written then.
+    """
+    if not isinstance(operations, list):
+        raise ValueError('operations must be a list.')
+    with transaction.atomic():
+        fields = {field.pk: field for field in form.fields.select_for_update()}
+        order = max((field.order for field in fields.values()), default=0)
+        created = []
+        updated = {}
+        changed = set()
+        deleted = set()
+        reparented = []
+
+        for operation in operations:
+            kind = operation.get('op') if isinstance(operation, dict) else None
+            if kind == 'add':
+                order += 1
+                field = FormField(form=form, order=order)
+                apply_field_data(field, _field_data(operation))
+                created.append(field)
+                reparented.append(field)
+            elif kind in ('update', 'delete'):
+                field = fields.get(parse_field_id(operation.get('id')))
+                if field is None:
+                    raise ValueError(f"Field {operation.get('id')} is not on this form.")
+                if kind == 'delete':
+                    deleted.add(field.pk)
+                    del fields[field.pk]
+                    updated.pop(field.pk, None)
+                else:
+                    attributes = apply_field_data(field, _field_data(operation))
+                    if 'parent_field' in attributes:
+                        reparented.append(field)
+                    changed.update(attributes)
+                    updated[field.pk] = field
+            elif kind == 'reorder':
+                for index, field_id in enumerate(parse_field_ids(operation.get('field_ids', []))):
+                    if field_id in fields:
+                        fields[field_id].order = index
+                        updated[field_id] = fields[field_id]
+                changed.add('order')
+            else:
+                raise ValueError(f'Unknown operation {kind!r}.')
+
+        for field in reparented:
+            if field.parent_field_id is not None and field.parent_field_id not in fields:
+                raise ValueError(f'Parent field {field.parent_field_id} is not on this form.')
+        for field in updated.values():
+            # As the foreign key's SET_NULL would, for children of deleted fields
+            if field.parent_field_id in deleted:
+                field.parent_field_id = None
+                changed.add('parent_field')
+
+        if deleted:
+            FormField.objects.filter(pk__in=deleted).delete()
+        if updated and changed:
+            FormField.objects.bulk_update(list(updated.values()), sorted(changed))
+        if created:
+            FormField.objects.bulk_create(created)
+        version = bump_schema_version(form)
+    return version, [field.pk for field in created]
@@ -0,0 +1,111 @@
+"""Server-side evaluation of the ``visible_condition`` / ``enabled_condition`` of fields.
+
+A condition is a ``{field_name: value}`` dict that holds when every named
+field has exactly that value, as in the browser (``form_submit.html``):
+the posted value, so the checked option of a radio (empty when none is) and
+the checked options of a checkbox joined by commas. Names of fields that are not on the form are ignored. Predicates take the
+answers as a ``{field_id: value_text}`` dict.
+"""
+from .models import FieldType, FormAnswer
+
+
+def _always(values):
+    return True
+
+
+def compile_condition(condition, by_name):
+    """Turn a condition dict into a predicate over ``{field_id: value_text}`` answers."""
+    checks = tuple(
+        (by_name[name].id, expected) for name, expected in (condition or {}).items() if name in by_name
+    )
+    if not checks:
+        return _always
+    if len(checks) == 1:
+        (field_id, expected), = checks
+        return lambda values: values.get(field_id, '') == expected
+    return lambda values: all(values.get(field_id, '') == expected for field_id, expected in checks)
+
+
+class ConditionSet:
+    """The compiled conditions of one schema version.
+
+    Falsy when no field of the form has a condition, so callers can skip
+    evaluation entirely.
+    """
+
+    def __init__(self, fields):
+        by_name = {field.name: field for field in fields}
+        predicates = []
+        referenced = set()
+        for field in fields:
+            for condition in (field.visible_condition, field.enabled_condition):
+                predicate = compile_condition(condition, by_name)
+                if predicate is not _always:
+                    predicates.append((field.id, predicate))
+                    referenced.update(by_name[name].id for name in condition if name in by_name)
+        self.predicates = tuple(predicates)
+        # Field ids read by any predicate; they alone decide the outcome
+        self.referenced = tuple(sorted(referenced))
+
+    def __bool__(self):
+        return bool(self.predicates)
+
+    def inactive(self, values):
+        """Ids of the fields hidden or disabled for ``values``."""
+        return frozenset(field_id for field_id, predicate in self.predicates if not predicate(values))
+
+    def memoized(self):
+        """Return an ``inactive()`` for evaluating many submissions.
+
+        Results are memoized on the values of the referenced fields, which
+        few distinct combinations cover in practice.
+        """
+        seen = {}
+
+        def inactive(values):
+            key = tuple(values.get(field_id, '') for field_id in self.referenced)
+            result = seen.get(key)
+            if result is None:
+                result = seen[key] = self.inactive(values)
+            return result
+        return inactive
+
+    def inactive_many(self, rows):
+        """Lazily evaluate ``inactive()`` for each answer dict of ``rows``."""
+        return map(self.memoized(), rows)
+
+
+def revalidate(schema, submissions, batch_size=1000):
+    """Re-check stored ``submissions`` of one form against ``schema``.
+
+    Yields ``(submission_id, stored_inactive, missing_required)`` for every
+    submission that stores answers of hidden or disabled fields or lacks an
+    answer to a shown required field. Admin-only fields are not required, as
+    on submission by a non-admin. Submissions are read ``batch_size`` at a
+    time with one query for their answers.
+    """
+    required = tuple(
+        field.id for field in schema.fields
+        if field.is_required and not field.admin_only and field.field_type != FieldType.PANEL
+    )
+    inactive = schema.conditions.memoized() if schema.conditions else (lambda values: frozenset())
+    last_pk = 0
+    while True:
+        ids = list(
+            submissions.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        answers = {pk: {} for pk in ids}
+        for submission_id, field_id, value_text in FormAnswer.objects.filter(
+            submission_id__in=ids
+        ).values_list('submission_id', 'field_id', 'value_text'):
+            answers[submission_id][field_id] = value_text
+        for pk in ids:
+            values = answers[pk]
+            hidden = inactive(values)
+            stored_inactive = hidden.intersection(values)
+            missing = [field_id for field_id in required if field_id not in hidden and not values.get(field_id)]
+            if stored_inactive or missing:
+                yield pk, stored_inactive, missing
+        last_pk = ids[-1]
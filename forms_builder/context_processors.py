@@ -1,5 +1,8 @@
+from .roles import is_form_admin
+
+
 def user_permissions(request):
     is_admin = False
     if request.user.is_authenticated:
-        is_admin = request.user.is_staff or request.user.groups.filter(name='admin').exists()
+        is_admin = is_form_admin(request)
     return {'is_form_admin': is_admin}
@@ -0,0 +1,80 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Form, FormSubmission, SubmissionStatus
+
+
+STATUS_COUNTERS = {
+    SubmissionStatus.PENDING: 'pending_count',
+    SubmissionStatus.APPROVED: 'approved_count',
+    SubmissionStatus.REJECTED: 'rejected_count',
+}
+
+
+def _deltas(statuses, sign):
+    per_status = Counter(statuses)
+    updates = {'submission_count': F('submission_count') + sign * sum(per_status.values())}
+    for status, count in per_status.items():
+        field = STATUS_COUNTERS[status]
+        updates[field] = F(field) + sign * count
+    return updates
+
+
+def _last_submission_at():
+    return Subquery(
+        FormSubmission.objects.filter(form=OuterRef('pk')).order_by('-submitted_at').values('submitted_at')[:1]
+    )
+
+
+def record_submission(submission):
+    """Count a newly created ``submission`` once its transaction commits.
+
+    Updating the Form row inside the submission's transaction would hold its
+    lock until commit and serialize every submitter to the form. A crash
+    between the commit and the update leaves drift that
+    ``reconcile_counters`` repairs.
+    """
+    submitted_at = Value(submission.submitted_at)
+    transaction.on_commit(lambda: Form.objects.filter(pk=submission.form_id).update(
+        last_submission_at=Greatest(Coalesce('last_submission_at', submitted_at), submitted_at),
+        **_deltas([submission.status], 1)
+    ))
+
+
+def record_deletion(submissions):
+    """Uncount ``(form_id, status)`` pairs of deleted submissions."""
+    by_form = {}
+    for form_id, status in submissions:
+        by_form.setdefault(form_id, []).append(status)
+    for form_id, statuses in by_form.items():
+        Form.objects.filter(pk=form_id).update(last_submission_at=_last_submission_at(), **_deltas(statuses, -1))
+
+
+def record_change(old_form_id, old_status, submission):
+    """Move ``submission`` between counters after its form or status changed."""
+    if (old_form_id, old_status) == (submission.form_id, submission.status):
+        return
+    record_deletion([(old_form_id, old_status)])
+    Form.objects.filter(pk=submission.form_id).update(
+        last_submission_at=_last_submission_at(), **_deltas([submission.status], 1)
+    )
+
+
+def _count(**filters):
+    counts = FormSubmission.objects.filter(form=OuterRef('pk'), **filters).order_by().values('form').annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def reconcile_counters(forms=None):
+    """Recompute the counters of ``forms`` (all forms by default) from the submissions table."""
+    forms = Form.objects.all() if forms is None else forms
+    return forms.update(
+        submission_count=_count(),
+        last_submission_at=_last_submission_at(),
+        **{field: _count(status=status) for status, field in STATUS_COUNTERS.items()},
+    )
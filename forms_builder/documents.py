@@ -0,0 +1,64 @@
+import json
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, F, Func, Q, Value
+
+from .models import FormSubmission, FormAnswer
+
+
+def read_answer_documents():
+    """Whether reads should use ``FormSubmission.answer_document`` over the EAV join."""
+    return getattr(settings, 'FORMS_BUILDER_READ_ANSWER_DOCUMENTS', False)
+
+
+def build_document(answers):
+    """Build an answer document from ``(field_id, value_text)`` pairs."""
+    return {str(field_id): value_text for field_id, value_text in answers}
+
+
+def document_values(document):
+    """Map an answer document back to ``{field_id: value_text}``."""
+    return {int(field_id): value_text for field_id, value_text in document.items()}
+
+
+def set_document_value(submission_id, field_id, value_text):
+    """Update one answer of a stored document, if the submission has one."""
+    with transaction.atomic():
+        submission = FormSubmission.objects.select_for_update().only('answer_document').get(pk=submission_id)
+        if submission.answer_document is not None:
+            submission.answer_document[str(field_id)] = value_text
+            submission.save(update_fields=['answer_document'])
+
+
+def document_search(search_query):
+    """Condition matching submissions whose document has an answer containing ``search_query``.
+
+    On PostgreSQL only the document values are searched, through a
+    case-insensitive literal ``like_regex`` jsonpath filter. Other databases
+    fall back to a text match on the serialized document.
+    """
+    if connection.vendor == 'postgresql':
+        literal = json.dumps(search_query)
+        return Q(Func(
+            F('answer_document'),
+            Value(f'$.* ? (@ like_regex {literal} flag "iq")'),
+            function='jsonb_path_exists',
+            output_field=BooleanField(),
+        ))
+    return Q(answer_document__icontains=search_query)
+
+
+def backfill_documents(submission_ids):
+    """Build and store the answer documents of ``submission_ids`` from the EAV rows."""
+    answers = {submission_id: [] for submission_id in submission_ids}
+    for submission_id, field_id, value_text in FormAnswer.objects.filter(
+        submission_id__in=submission_ids
+    ).order_by('pk').values_list('submission_id', 'field_id', 'value_text'):
+        answers[submission_id].append((field_id, value_text))
+    submissions = [
+        FormSubmission(pk=submission_id, answer_document=build_document(pairs))
+        for submission_id, pairs in answers.items()
+    ]
+    FormSubmission.objects.bulk_update(submissions, ['answer_document'])
+    return len(submissions)
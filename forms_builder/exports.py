@@ -0,0 +1,229 @@
+import csv
+import datetime
+import io
+import pickle
+import tempfile
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .documents import document_search, document_values, read_answer_documents
+from .models import FormAnswer, UploadedFile, FieldType
+from .search import search_index_enabled, search_submissions
+
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def filter_submissions(submissions, params, use_documents=None, use_search_index=None):
+    """Apply the faculty and search filters shared by the list and export views.
+
+    On PostgreSQL the search goes through the ``search_vector`` index and
+    annotates a ``rank``; other databases use substring matches.
+    """
+    if use_documents is None:
+        use_documents = read_answer_documents()
+    if use_search_index is None:
+        use_search_index = search_index_enabled()
+    selected_faculty = params.get('faculty')
+    if selected_faculty:
+        # faculte_id is copied from the select_faculte answer when the submission is written
+        submissions = submissions.filter(faculte_id=selected_faculty) if selected_faculty.isdigit() else submissions.none()
+
+    search_query = params.get('q', '').strip()
+    if search_query and use_search_index:
+        submissions = search_submissions(submissions, search_query)
+    elif search_query and use_documents:
+        # Submissions without a document yet fall back to their EAV answers
+        legacy_match = FormAnswer.objects.filter(submission=OuterRef('pk'), value_text__icontains=search_query)
+        submissions = submissions.filter(
+            Q(submitted_by__username__icontains=search_query) |
+            Q(submitted_by__first_name__icontains=search_query) |
+            Q(submitted_by__last_name__icontains=search_query) |
+            Q(submitted_by__email__icontains=search_query) |
+            document_search(search_query) |
+            Q(Exists(legacy_match), answer_document__isnull=True)
+        )
+    elif search_query:
+        submissions = submissions.filter(
+            Q(submitted_by__username__icontains=search_query) |
+            Q(submitted_by__first_name__icontains=search_query) |
+            Q(submitted_by__last_name__icontains=search_query) |
+            Q(submitted_by__email__icontains=search_query) |
+            Q(answers__value_text__icontains=search_query)
+        ).distinct()
+    return submissions
+
+
+def export_headers(fields):
+    return ['Submission ID', 'Submitted At', 'Status'] + [f.label for f in fields]
+
+
+def iter_export_rows(submissions, fields, file_url, chunk_size=EXPORT_CHUNK_SIZE, use_documents=None,
+                     conditions=None):
+    """Yield one export row per submission, newest first.
+
+    Submissions are walked with keyset pagination on the primary key, and the
+    answers and files of each chunk are pivoted in memory, so only
+    ``chunk_size`` submissions are ever held at once. With answer documents
+    enabled, only submissions that have not been backfilled yet are pivoted
+    from the EAV rows. Given the schema's ``conditions``, cells of fields
+    that were hidden or disabled for a submission are left empty.
+    """
+    if use_documents is None:
+        use_documents = read_answer_documents()
+    fields = list(fields)
+    inactive = conditions.memoized() if conditions else None
+    last_pk = None
+    while True:
+        page = submissions.order_by('-pk')
+        if last_pk is not None:
+            page = page.filter(pk__lt=last_pk)
+        if use_documents:
+            page = list(page.values_list('pk', 'submitted_at', 'status', 'answer_document')[:chunk_size])
+        else:
+            page = [row + (None,) for row in page.values_list('pk', 'submitted_at', 'status')[:chunk_size]]
+        if not page:
+            return
+
+        answers = {}
+        files = {}
+        ids = [pk for pk, _, _, document in page if document is None]
+        if ids:
+            for submission_id, field_id, value_text in FormAnswer.objects.filter(
+                submission_id__in=ids
+            ).values_list('submission_id', 'field_id', 'value_text'):
+                answers.setdefault(submission_id, {})[field_id] = value_text
+            for submission_id, field_id, stored_filename in UploadedFile.objects.filter(
+                submission_id__in=ids
+            ).values_list('submission_id', 'field_id', 'stored_filename'):
+                files.setdefault(submission_id, {})[field_id] = stored_filename
+
+        for pk, submitted_at, status, document in page:
+            if document is None:
+                answer_dict = answers.get(pk, {})
+                file_dict = files.get(pk, {})
+            else:
+                # Documents store the stored filename as the FILE answer
+                answer_dict = file_dict = document_values(document)
+            row = [pk, submitted_at, status]
+            hidden = inactive(answer_dict) if inactive else ()
+            for field in fields:
+                if field.id in hidden:
+                    row.append('')
+                elif field.field_type == FieldType.FILE:
+                    stored_filename = file_dict.get(field.id)
+                    row.append(file_url(stored_filename) if stored_filename else '')
+                else:
+                    row.append(answer_dict.get(field.id, ''))
+            yield row
+
+        last_pk = page[-1][0]
+
+
+def stream_csv(headers, rows, batch_size=100):
+    """Yield CSV text for ``headers`` and ``rows``, ``batch_size`` lines at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield _drain(buffer)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def _drain(buffer):
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+def _excel_value(value, field_type=None):
+    """Convert an export value to the native type Excel should store."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value).replace(tzinfo=None)
+        return value
+    if not isinstance(value, str):
+        return value
+    if value and field_type == FieldType.NUMBER:
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    elif value and field_type == FieldType.DATE:
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            pass
+    return ILLEGAL_CHARACTERS_RE.sub('', value)
+
+
+def _display_width(value):
+    if isinstance(value, datetime.datetime):
+        return 19
+    if isinstance(value, datetime.date):
+        return 10
+    return len(str(value))
+
+
+def write_excel(output, title, fields, rows):
+    """Write an Excel workbook of ``rows`` to the binary file ``output``.
+
+    openpyxl's write-only mode writes column widths before the first row, so
+    the single pass over the data spools typed rows to a temporary file while
+    measuring widths, and the workbook is then streamed from that spool.
+    """
+    headers = export_headers(fields)
+    column_types = [None, None, None] + [f.field_type for f in fields]
+    widths = [len(header) for header in headers]
+
+    with tempfile.TemporaryFile() as spool:
+        pickler = pickle.Pickler(spool, protocol=pickle.HIGHEST_PROTOCOL)
+        row_count = 0
+        for row in rows:
+            row = [_excel_value(value, field_type) for value, field_type in zip(row, column_types)]
+            for index, value in enumerate(row):
+                width = _display_width(value)
+                if width > widths[index]:
+                    widths[index] = width
+            pickler.dump(row)
+            pickler.clear_memo()
+            row_count += 1
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title)
+        for index, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(index)].width = min(width + 2, 50)  # Limit max width to 50
+
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        center_alignment = Alignment(horizontal="center", vertical="center")
+        header_row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = center_alignment
+            header_row.append(cell)
+        ws.append(header_row)
+
+        spool.seek(0)
+        unpickler = pickle.Unpickler(spool)
+        for _ in range(row_count):
+            ws.append(unpickler.load())
+
+        wb.save(output)
@@ -29,12 +29,17 @@ class FormForm(forms.ModelForm):
 class FormUpdateForm(forms.ModelForm):
     class Meta:
         model = Form
-        fields = ['title', 'description', 'form_type', 'status', 'access_level', 'single_submission', 'allow_update', 'image']
+        fields = [
+            'title', 'description', 'form_type', 'status', 'access_level', 'single_submission', 'allow_update',
+            'submission_rate', 'submission_burst', 'image',
+        ]
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'form_type': forms.Select(attrs={'class': 'form-select'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
             'access_level': forms.Select(attrs={'class': 'form-select'}),
+            'submission_rate': forms.NumberInput(attrs={'class': 'form-control', 'min': 0}),
+            'submission_burst': forms.NumberInput(attrs={'class': 'form-control', 'min': 0}),
             'image': forms.FileInput(attrs={'class': 'form-control'})
         }
@@ -0,0 +1,245 @@
+"""Opt-in per-request SQL and timing instrumentation.
+
+With ``FORMS_BUILDER_INSTRUMENTATION`` on, every request records its SQL
+query count and time, its repeated queries (the same statement run more than
+once, the usual sign of an N+1) and its total time. They are sent back in a
+``Server-Timing`` header and added to an in-memory aggregate per URL name,
+served in the Prometheus text format by the ``metrics`` view. Aggregates are
+per process. With the setting off the middleware removes itself.
+"""
+import contextvars
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_recorder = contextvars.ContextVar('forms_builder_query_recorder', default=None)
+# Collapse IN lists so that batches of different sizes share a fingerprint
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def enabled():
+    return getattr(settings, 'FORMS_BUILDER_INSTRUMENTATION', False)
+
+
+def fingerprint(sql):
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """The SQL run on behalf of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Number of queries that repeated an earlier statement of the request."""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+
+def _record(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _instrument(connection, **kwargs):
+    # Connections are per thread, and under ASGI the queries of a request run
+    # in sync_to_async threads; the wrapper finds the request's recorder
+    # through the context variable, which follows the request there.
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+class ViewStats:
+    """Totals since startup and the last ``window`` requests of one URL name."""
+
+    def __init__(self, window):
+        self.requests = 0
+        self.queries = 0
+        self.duplicates = 0
+        self.sql_seconds = 0.0
+        self.seconds = 0.0
+        self.recent = deque(maxlen=window)
+        self.recent_queries = deque(maxlen=window)
+        # Most runs of each repeated statement in a single request
+        self.repeated = {}
+
+    def add(self, recorder, seconds):
+        self.requests += 1
+        self.queries += recorder.count
+        self.duplicates += recorder.duplicates
+        self.sql_seconds += recorder.duration
+        self.seconds += seconds
+        self.recent.append(seconds)
+        self.recent_queries.append(recorder.count)
+        for statement, count in recorder.statements.items():
+            if count > self.repeated.get(statement, 1):
+                self.repeated[statement] = count
+
+
+class Aggregates:
+    """Thread-safe ``{url_name: ViewStats}``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def add(self, url_name, recorder, seconds):
+        with self.lock:
+            stats = self.views.get(url_name)
+            if stats is None:
+                stats = self.views[url_name] = ViewStats(
+                    getattr(settings, 'FORMS_BUILDER_INSTRUMENTATION_WINDOW', 1000)
+                )
+            stats.add(recorder, seconds)
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+
+aggregates = Aggregates()
+
+
+def _quantile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+METRICS = (
+    ('requests_total', 'counter'),
+    ('request_duration_seconds', 'summary'),
+    ('sql_queries_total', 'counter'),
+    ('sql_queries_per_request', 'summary'),
+    ('sql_duration_seconds_total', 'counter'),
+    ('sql_duplicate_queries_total', 'counter'),
+    ('sql_repeated_statement_max', 'gauge'),
+)
+
+
+def prometheus_text(repeated_statements=5):
+    """The aggregates in the Prometheus text exposition format.
+
+    Only the ``repeated_statements`` most repeated statements of each view
+    are listed.
+    """
+    samples = defaultdict(list)
+    with aggregates.lock:
+        for url_name, stats in sorted(aggregates.views.items()):
+            view = f'view="{_label(url_name)}"'
+            durations = sorted(stats.recent)
+            queries = sorted(stats.recent_queries)
+            samples['requests_total'].append(('', view, stats.requests))
+            for q in QUANTILES:
+                samples['request_duration_seconds'].append(
+                    ('', f'{view},quantile="{q}"', f'{_quantile(durations, q):.6f}')
+                )
+                samples['sql_queries_per_request'].append(('', f'{view},quantile="{q}"', _quantile(queries, q)))
+            samples['request_duration_seconds'] += [
+                ('_sum', view, f'{stats.seconds:.6f}'), ('_count', view, stats.requests),
+            ]
+            samples['sql_queries_per_request'] += [
+                ('_sum', view, stats.queries), ('_count', view, stats.requests),
+            ]
+            samples['sql_queries_total'].append(('', view, stats.queries))
+            samples['sql_duration_seconds_total'].append(('', view, f'{stats.sql_seconds:.6f}'))
+            samples['sql_duplicate_queries_total'].append(('', view, stats.duplicates))
+            repeated = sorted(stats.repeated.items(), key=lambda item: -item[1])[:repeated_statements]
+            for statement, count in repeated:
+                samples['sql_repeated_statement_max'].append(
+                    ('', f'{view},statement="{_label(statement)}"', count)
+                )
+
+    lines = []
+    for name, kind in METRICS:
+        if samples[name]:
+            lines.append(f'# TYPE forms_builder_{name} {kind}')
+            lines += [f'forms_builder_{name}{suffix}{{{labels}}} {value}' for suffix, labels, value in samples[name]]
+    return '\n'.join(lines) + '\n'
+
+
+def server_timing(recorder, seconds):
+    return (
+        f'sql;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+        f'dup;desc="{recorder.duplicates} repeated", '
+        f'total;dur={seconds * 1000:.1f}'
+    )
+
+
+class QueryInstrumentationMiddleware:
+    """Record the SQL and time of each request, see the module docstring.
+
+    Place it near the top of ``MIDDLEWARE`` so that it also sees the queries
+    of the session and authentication middleware. Streaming responses are
+    measured until they are returned, before their content is generated.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(_instrument, dispatch_uid='forms_builder_instrumentation')
+        for connection in connections.all(initialized_only=True):
+            _instrument(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            _instrument(connection)
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._finish(request, response, recorder, time.perf_counter() - start)
+
+    def _finish(self, request, response, recorder, seconds):
+        match = getattr(request, 'resolver_match', None)
+        aggregates.add(match.url_name or match.view_name if match else 'unresolved', recorder, seconds)
+        response['Server-Timing'] = server_timing(recorder, seconds)
+        return response
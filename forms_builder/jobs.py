@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import tempfile
+import uuid
+from datetime import timedelta
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.files.base import File
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .exports import export_headers, filter_submissions, iter_export_rows, stream_csv, write_excel
+from .models import ExportJob, ExportFormat, ExportStatus
+from .schema import get_schema
+from .storage import upload_url
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FILTER_KEYS = ('faculty', 'q')
+PROGRESS_INTERVAL = 500
+
+
+def export_filters(params):
+    """Keep only the non-empty export filters from ``params``."""
+    return {key: params.get(key, '').strip() for key in EXPORT_FILTER_KEYS if params.get(key, '').strip()}
+
+
+def export_cache_key(form, export_format, filters):
+    """Key identifying an export artifact: form, format, filters and data freshness."""
+    stats = form.submissions.aggregate(count=Count('pk'), last=Max('updated_at'))
+    payload = json.dumps([
+        form.pk,
+        form.schema_version,
+        export_format,
+        sorted(filters.items()),
+        stats['count'],
+        stats['last'].isoformat() if stats['last'] else None,
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def request_export(form, export_format, filters, user, base_url):
+    """Return a queued, running or finished job for this export, creating one if needed."""
+    cache_key = export_cache_key(form, export_format, filters)
+    job = ExportJob.objects.filter(
+        form=form, cache_key=cache_key,
+        status__in=[ExportStatus.QUEUED, ExportStatus.RUNNING, ExportStatus.DONE],
+    ).first()
+    if job and (job.status != ExportStatus.DONE or job.file.storage.exists(job.file.name)):
+        return job
+    return ExportJob.objects.create(
+        form=form,
+        requested_by=user,
+        export_format=export_format,
+        filters=filters,
+        cache_key=cache_key,
+        base_url=base_url,
+    )
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running and return it."""
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ExportStatus.QUEUED)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ExportStatus.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def _track_progress(job, rows):
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_INTERVAL == 0:
+            ExportJob.objects.filter(pk=job.pk).update(rows_done=done)
+    job.rows_done = done
+    ExportJob.objects.filter(pk=job.pk).update(rows_done=done)
+
+
+def _write_artifact(job):
+    form = job.form
+    schema = get_schema(form)
+    fields = schema.fields
+    submissions = filter_submissions(form.submissions.all(), job.filters)
+    job.rows_total = submissions.count()
+    ExportJob.objects.filter(pk=job.pk).update(rows_total=job.rows_total)
+
+    def file_url(name):
+        return urljoin(job.base_url, upload_url(name))
+
+    rows = _track_progress(job, iter_export_rows(submissions, fields, file_url, conditions=schema.conditions))
+    filename = f'{form.slug}_{uuid.uuid4().hex[:8]}.{job.export_format}'
+    with tempfile.TemporaryFile() as output:
+        if job.export_format == ExportFormat.EXCEL:
+            write_excel(output, f"{form.title[:31]} Submissions", fields, rows)
+        else:
+            for chunk in stream_csv(export_headers(fields), rows):
+                output.write(chunk.encode())
+        output.seek(0)
+        job.file.save(filename, File(output), save=False)
+
+
+def run_job(job):
+    """Generate the artifact of ``job`` in the export storage, then evict the artifacts it supersedes.
+
+    Any error marks the job failed.
+    """
+    try:
+        _write_artifact(job)
+    except Exception as exc:
+        logger.exception('Export job %s failed', job.pk)
+        job.status = ExportStatus.FAILED
+        job.error = str(exc)
+    else:
+        job.status = ExportStatus.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'error', 'rows_total', 'finished_at'])
+    if job.status == ExportStatus.DONE:
+        evict_superseded(job)
+    return job
+
+
+def fail_job(job, error):
+    """Mark ``job`` failed without touching its other columns."""
+    ExportJob.objects.filter(pk=job.pk).update(
+        status=ExportStatus.FAILED, error=str(error), finished_at=timezone.now()
+    )
+
+
+def delete_jobs(jobs):
+    """Delete ``jobs`` and their artifacts; returns how many were deleted."""
+    deleted = 0
+    for job in jobs:
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        deleted += 1
+    return deleted
+
+
+def evict_superseded(job):
+    """Delete the finished jobs of the same export as ``job`` that were created before it."""
+    return delete_jobs(ExportJob.objects.filter(
+        form_id=job.form_id, export_format=job.export_format, filters=job.filters,
+        status__in=[ExportStatus.DONE, ExportStatus.FAILED], created_at__lte=job.created_at,
+    ).exclude(pk=job.pk))
+
+
+def evict_expired(max_age=None):
+    """Delete the jobs finished more than ``FORMS_BUILDER_EXPORT_RETENTION`` seconds ago."""
+    if max_age is None:
+        max_age = getattr(settings, 'FORMS_BUILDER_EXPORT_RETENTION', 86400)
+    return delete_jobs(ExportJob.objects.filter(
+        status__in=[ExportStatus.DONE, ExportStatus.FAILED],
+        finished_at__lt=timezone.now() - timedelta(seconds=max_age),
+    ))
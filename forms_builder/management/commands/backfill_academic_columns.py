@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from academic import hierarchy
+
+from forms_builder.models import FormSubmission, FormAnswer
+from forms_builder.schema import ACADEMIC_COLUMNS
+from forms_builder.submissions import academic_columns
+
+
+class Command(BaseCommand):
+    help = 'Copy the academic select answers of submissions into their faculte/domaine/... columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only backfill submissions of this form id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        submissions = FormSubmission.objects.all()
+        if options['form']:
+            submissions = submissions.filter(form_id=options['form'])
+        fields = [column.removesuffix('_id') for column, _ in ACADEMIC_COLUMNS.values()]
+
+        total = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                submissions.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            answers = {submission_id: [] for submission_id in ids}
+            for submission_id, field_type, value_text in FormAnswer.objects.filter(
+                submission_id__in=ids, field__field_type__in=list(ACADEMIC_COLUMNS)
+            ).values_list('submission_id', 'field__field_type', 'value_text'):
+                answers[submission_id].append((field_type, value_text))
+            tree = hierarchy.get_tree()
+            FormSubmission.objects.bulk_update([
+                FormSubmission(pk=submission_id, **academic_columns(pairs, tree))
+                for submission_id, pairs in answers.items()
+            ], fields)
+            total += len(ids)
+            last_pk = ids[-1]
+            self.stdout.write(f'Backfilled {total} submissions...')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled academic columns for {total} submissions.'))
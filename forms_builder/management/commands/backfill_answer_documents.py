@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from forms_builder.documents import backfill_documents
+from forms_builder.models import FormSubmission
+
+
+class Command(BaseCommand):
+    help = 'Build the denormalized answer document of submissions from their FormAnswer rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only backfill submissions of this form id')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--rebuild', action='store_true', help='Also rebuild documents that already exist')
+
+    def handle(self, *args, **options):
+        submissions = FormSubmission.objects.all()
+        if options['form']:
+            submissions = submissions.filter(form_id=options['form'])
+        if not options['rebuild']:
+            submissions = submissions.filter(answer_document__isnull=True)
+
+        total = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                submissions.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            total += backfill_documents(ids)
+            last_pk = ids[-1]
+            self.stdout.write(f'Backfilled {total} submissions...')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled answer documents for {total} submissions.'))
@@ -0,0 +1,355 @@
+import io
+import json
+import time
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from academic.models import Faculte
+from forms_builder import benchmarks
+from forms_builder.exports import filter_submissions, iter_export_rows
+from forms_builder.models import FieldType, Form, FormField
+from forms_builder.schema import bump_schema_version, get_schema
+from forms_builder.search import search_index_enabled
+from forms_builder.submissions import SubmissionWriter
+from forms_builder.validation import compile_validators
+
+
+class Command(BaseCommand):
+    help = 'Run performance benchmarks against the configured database'
+
+    scenarios = [
+        'opening_day', 'submit', 'render', 'export_csv', 'export_excel', 'storage', 'search', 'http', 'validate',
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=self.scenarios)
+        parser.add_argument('--fields', type=int, default=40, help='Number of fields on the benchmark form')
+        parser.add_argument('--submissions', type=int, default=500,
+                            help='Number of submissions to post or seed (students for opening_day)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Number of concurrent clients')
+        parser.add_argument('--forms', type=int, default=1, help='Number of inscription forms (opening_day)')
+        parser.add_argument('--seed-submissions', type=int, default=1000,
+                            help='Submissions seeded per form before the run (opening_day)')
+        parser.add_argument('--exports', type=int, default=3, help='Number of CSV and Excel exports (opening_day)')
+        parser.add_argument('--trace-memory', action='store_true', help='Report peak Python memory (slows the run down)')
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help='Server the http scenario targets, e.g. uvicorn serving ufas1forms.asgi')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark form and its data')
+        parser.add_argument('--output', help='Also write the result as JSON to this file')
+        parser.add_argument('--compare', help='JSON result of an earlier run to compare against')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Percentage by which a metric must get worse to count as a regression')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_superuser=True).first()
+        if not user:
+            raise CommandError('No admin user found. Please create a superuser first.')
+
+        if options['scenario'] == 'opening_day':
+            result = self.run_opening_day(user, options)
+        else:
+            form = benchmarks.create_benchmark_form(user, options['fields'])
+            try:
+                result = getattr(self, f"run_{options['scenario']}")(form, options)
+            finally:
+                if not options['keep']:
+                    form.delete()
+        result['recorded_at'] = timezone.now().isoformat()
+
+        self.stdout.write(json.dumps(result, indent=2))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, indent=2)
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                self.report_comparison(json.load(baseline), result, options['threshold'])
+
+    def report_comparison(self, baseline, result, threshold):
+        rows = benchmarks.compare(baseline, result, threshold)
+        for path, before, after, change, regressed in rows:
+            line = f'{path}: {before} -> {after} ({change:+.1f}%)'
+            self.stdout.write(self.style.ERROR(f'REGRESSION {line}') if regressed else line)
+        regressions = sum(1 for *_, regressed in rows if regressed)
+        if regressions:
+            raise CommandError(f'{regressions} metrics regressed by more than {threshold}%.')
+        self.stdout.write(self.style.SUCCESS(f'No regression beyond {threshold}% in {len(rows)} metrics.'))
+
+    def run_opening_day(self, user, options):
+        """Inscriptions opening: students load and post the form while staff browse, search and export.
+
+        ``--forms`` copies of the inscription form with ``--fields`` fields are
+        seeded with ``--seed-submissions`` submissions each. Then
+        ``--submissions`` students each load and submit the first form.
+        Uploads posted by the students stay in the upload storage until
+        ``gc_uploads`` collects them.
+        """
+        if not Faculte.objects.exists():
+            call_command('seed_academic_data', stdout=io.StringIO())
+        forms = benchmarks.create_inscription_forms(user, options['forms'], options['fields'])
+        students = benchmarks.create_students(options['submissions'])
+        try:
+            for form in forms:
+                benchmarks.seed_submissions(form, get_schema(form).fields, options['seed_submissions'])
+            return self._opening_day(user, forms[0], students, options)
+        finally:
+            if not options['keep']:
+                Form.objects.filter(pk__in=[form.pk for form in forms]).delete()
+                User.objects.filter(pk__in=[student.pk for student in students]).delete()
+
+    def _opening_day(self, user, form, students, options):
+        fields = get_schema(form).fields
+        concurrency = options['concurrency']
+        form_url = reverse('form_submit', kwargs={'slug': form.slug})
+        list_url = reverse('submission_list', kwargs={'form_pk': form.pk})
+        staff_requests = max(len(students) // 10, 1)
+
+        # Sessions are opened before the timed phases; test clients are not shared between threads
+        clients = [benchmarks.logged_in_client(student) for student in students]
+        staff = [benchmarks.logged_in_client(user) for _ in range(staff_requests)]
+
+        result = {
+            'scenario': 'opening_day',
+            'forms': options['forms'],
+            'fields': len(fields),
+            'seeded_submissions': options['seed_submissions'],
+            'students': len(students),
+            'concurrency': concurrency,
+        }
+        result['form_get'] = benchmarks.measure(lambda client: client.get(form_url), clients, concurrency)
+        # The counter updates of the form row contend between concurrent submitters
+        result['form_post'] = benchmarks.measure(
+            lambda job: job[1].post(form_url, benchmarks.sample_post_data(fields, job[0])),
+            list(enumerate(clients)), concurrency, expected_status=302,
+            statements=benchmarks.StatementTimer(f'UPDATE "{Form._meta.db_table}"'),
+        )
+        result['submission_list'] = benchmarks.measure(lambda client: client.get(list_url), staff, concurrency)
+        result['search'] = benchmarks.measure(
+            lambda job: job[1].get(list_url, {'q': f'Answer {job[0]} for'}),
+            list(enumerate(staff)), concurrency,
+        )
+        for name in ('export_csv', 'export_excel'):
+            url = reverse(name, kwargs={'form_pk': form.pk})
+            result[name] = benchmarks.measure(lambda client: client.get(url), staff[:options['exports']], 1)
+        return result
+
+    def run_submit(self, form, options):
+        fields = list(FormField.objects.filter(form=form))
+        url = reverse('form_submit', kwargs={'slug': form.slug})
+
+        def submit(seed):
+            client = Client(HTTP_HOST='localhost')
+            elapsed, counter, response = benchmarks.timed(
+                client.post, url, benchmarks.sample_post_data(fields, seed)
+            )
+            if response.status_code != 302:
+                raise CommandError(f'Submission {seed} failed with status {response.status_code}')
+            return elapsed, counter.get('INSERT'), counter.total
+
+        start = time.perf_counter()
+        results = benchmarks.run_concurrently(submit, range(options['submissions']), options['concurrency'])
+        wall = time.perf_counter() - start
+
+        return {
+            'scenario': 'submit',
+            'fields': len(fields),
+            'concurrency': options['concurrency'],
+            'throughput_rps': round(len(results) / wall, 2),
+            'latency': benchmarks.summarize([elapsed for elapsed, _, _ in results]),
+            'inserts_per_submission': max(inserts for _, inserts, _ in results),
+            'queries_per_submission': max(total for _, _, total in results),
+        }
+
+    def run_render(self, form, options):
+        url = reverse('form_submit', kwargs={'slug': form.slug})
+
+        def render(_):
+            elapsed, counter, response = benchmarks.timed(Client(HTTP_HOST='localhost').get, url)
+            if response.status_code != 200:
+                raise CommandError(f'Rendering failed with status {response.status_code}')
+            return elapsed, counter.total
+
+        result = {'scenario': 'render', 'fields': options['fields'], 'concurrency': options['concurrency']}
+        for mode, timeout in [('uncached', 0), ('fragment_cache', 3600)]:
+            with override_settings(FORMS_BUILDER_FORM_CACHE_TIMEOUT=timeout):
+                render(None)  # warm the schema and fragment caches
+                start = time.perf_counter()
+                results = benchmarks.run_concurrently(render, range(options['submissions']), options['concurrency'])
+                wall = time.perf_counter() - start
+            result[mode] = {
+                'throughput_rps': round(len(results) / wall, 2),
+                'latency': benchmarks.summarize([elapsed for elapsed, _ in results]),
+                'queries_per_request': max(total for _, total in results),
+            }
+        return result
+
+    def run_export_csv(self, form, options):
+        return self._run_export(form, options, 'export_csv')
+
+    def run_export_excel(self, form, options):
+        return self._run_export(form, options, 'export_excel')
+
+    def _run_export(self, form, options, url_name):
+        fields = list(FormField.objects.filter(form=form))
+        benchmarks.seed_submissions(form, fields, options['submissions'])
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(form.created_by)
+        url = reverse(url_name, kwargs={'form_pk': form.pk})
+
+        if options['trace_memory']:
+            tracemalloc.start()
+        counter = benchmarks.QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            response = client.get(url)
+            content = iter(response.streaming_content)
+            size = len(next(content))
+            first_byte = time.perf_counter() - start
+            for chunk in content:
+                size += len(chunk)
+            total = time.perf_counter() - start
+        response.close()
+        result = {
+            'scenario': url_name,
+            'fields': len(fields),
+            'submissions': options['submissions'],
+            'time_to_first_byte_ms': round(first_byte * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'bytes': size,
+            'queries': counter.total,
+        }
+        if options['trace_memory']:
+            result['peak_python_memory_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+        return result
+
+    def run_storage(self, form, options):
+        fields = list(FormField.objects.filter(form=form))
+        benchmarks.seed_submissions(form, fields, options['submissions'])
+        call_command('backfill_answer_documents', form=form.pk, stdout=io.StringIO())
+        submissions = form.submissions.all()
+        search = {'q': f'Answer {options["submissions"] // 2} for'}
+
+        result = {'scenario': 'storage', 'fields': len(fields), 'submissions': options['submissions']}
+        for layout, use_documents in [('eav', False), ('document', True)]:
+            export_time, export_queries, _ = benchmarks.timed(
+                lambda: sum(1 for _ in iter_export_rows(submissions, fields, str, use_documents=use_documents))
+            )
+            search_time, search_queries, matches = benchmarks.timed(
+                lambda: len(list(filter_submissions(submissions, search, use_documents=use_documents).values_list('pk')))
+            )
+            result[layout] = {
+                'export_ms': round(export_time * 1000, 2),
+                'export_queries': export_queries.total,
+                'search_ms': round(search_time * 1000, 2),
+                'search_matches': matches,
+            }
+        return result
+
+    def run_search(self, form, options):
+        fields = list(FormField.objects.filter(form=form))
+        submissions = form.submissions.all()
+        layouts = [('substring', False)] + ([('index', True)] if search_index_enabled() else [])
+        queries = [{'q': f'Answer {seed} for'} for seed in range(0, options['submissions'], max(options['submissions'] // 20, 1))]
+
+        result = {'scenario': 'search', 'fields': len(fields), 'steps': []}
+        seeded = 0
+        for step in range(1, 5):
+            target = options['submissions'] * step // 4
+            benchmarks.seed_submissions(form, fields, target - seeded, batch_size=min(1000, target - seeded))
+            seeded = target
+            if search_index_enabled():
+                call_command('rebuild_search_index', form=form.pk, missing=True, stdout=io.StringIO())
+
+            row = {'submissions': seeded}
+            for layout, use_search_index in layouts:
+                latencies = []
+                for params in queries:
+                    elapsed, _, _ = benchmarks.timed(
+                        lambda: list(filter_submissions(submissions, params, use_search_index=use_search_index)
+                                     .values_list('pk')[:50])
+                    )
+                    latencies.append(elapsed)
+                row[layout] = benchmarks.summarize(latencies)
+            result['steps'].append(row)
+        return result
+
+    def run_http(self, form, options):
+        """Requests/second and latency of the read endpoints of a running server.
+
+        Run it once against the current tree and once against a checkout with
+        the sync views to compare them under the same server.
+        """
+        field = FormField.objects.filter(form=form).first()
+        faculte = Faculte.objects.first()
+        endpoints = {
+            'api_academic_tree': reverse('api_academic_tree'),
+            'api_facultes': reverse('api_facultes'),
+            'api_domaines': f"{reverse('api_domaines')}?faculte_id={faculte.pk if faculte else ''}",
+            'api_child_options': f"{reverse('api_child_options', kwargs={'field_pk': field.pk})}?parent_value=",
+            'form_submit': reverse('form_submit', kwargs={'slug': form.slug}),
+            'form_success': reverse('form_success', kwargs={'slug': form.slug}),
+        }
+        base_url = options['base_url'].rstrip('/')
+
+        result = {'scenario': 'http', 'base_url': base_url, 'concurrency': options['concurrency'], 'endpoints': {}}
+        for name, path in endpoints.items():
+            url = base_url + path
+            elapsed, status = benchmarks.fetch(url)  # warm the server-side caches
+            if status != 200:
+                raise CommandError(f'{url} answered with status {status}')
+            start = time.perf_counter()
+            results = benchmarks.run_concurrently(
+                lambda _: benchmarks.fetch(url), range(options['submissions']), options['concurrency']
+            )
+            wall = time.perf_counter() - start
+            result['endpoints'][name] = {
+                'throughput_rps': round(len(results) / wall, 2),
+                'latency': benchmarks.summarize([elapsed for elapsed, _ in results]),
+                'errors': sum(1 for _, status in results if status != 200),
+            }
+        return result
+
+    def run_validate(self, form, options):
+        """Cost of reading and validating one submission, without any database write."""
+        rules = {
+            FieldType.TEXT: {'min_length': 2, 'max_length': 200, 'pattern': r'[\w ]+'},
+            FieldType.NUMBER: {'min': 0, 'max': 100},
+            FieldType.TEXTAREA: {'max_length': 2000},
+        }
+        for field_type, validation_json in rules.items():
+            FormField.objects.filter(form=form, field_type=field_type).update(validation_json=validation_json)
+        bump_schema_version(form)
+        schema = get_schema(form)
+        factory = RequestFactory()
+        requests = []
+        for seed in range(options['submissions']):
+            request = factory.post('/', benchmarks.sample_post_data(schema.fields, seed))
+            request.user = AnonymousUser()
+            request.POST  # parse the body outside of the timings
+            requests.append(request)
+
+        def collect(request):
+            start = time.perf_counter()
+            writer = SubmissionWriter(form, schema, request).collect()
+            elapsed = time.perf_counter() - start
+            if writer.errors:
+                raise CommandError(f'Unexpected validation errors: {writer.errors}')
+            return elapsed
+
+        compile_time, _, _ = benchmarks.timed(compile_validators, schema.fields)
+        latencies = [collect(request) for request in requests]
+        return {
+            'scenario': 'validate',
+            'fields': len(schema.fields),
+            'submissions': len(requests),
+            'compile_validators_ms': round(compile_time * 1000, 3),
+            'collect_mean_us': round(sum(latencies) / len(latencies) * 1e6, 1),
+            'collect_latency': benchmarks.summarize(latencies),
+        }
@@ -0,0 +1,71 @@
+import os
+import shutil
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from forms_builder.storage import UPLOAD_DIR, is_recent, iter_stored_files, referenced_names, upload_storage
+
+
+class Command(BaseCommand):
+    help = 'Delete or quarantine uploaded files that no UploadedFile row or FILE answer references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be reclaimed')
+        parser.add_argument('--quarantine', metavar='DIR', help='Move orphans to this directory instead of deleting them')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--min-age', type=int, default=60,
+                            help='Ignore files modified in the last N minutes (uploads in flight)')
+        parser.add_argument('--loop', type=int, metavar='SECONDS', help='Run again every N seconds')
+
+    def handle(self, *args, **options):
+        try:
+            root = upload_storage().path(UPLOAD_DIR)
+        except NotImplementedError:
+            raise CommandError('Garbage collection needs a storage with local paths.')
+
+        while True:
+            if os.path.isdir(root):
+                self.collect(root, options)
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+
+    def collect(self, root, options):
+        scanned = orphans = reclaimed = 0
+        batch = {}
+        for stored_name, size in iter_stored_files(root, options['min_age'] * 60):
+            scanned += 1
+            batch[stored_name] = size
+            if len(batch) >= options['batch_size']:
+                count, size = self.reclaim(root, batch, options)
+                orphans, reclaimed = orphans + count, reclaimed + size
+                batch = {}
+        if batch:
+            count, size = self.reclaim(root, batch, options)
+            orphans, reclaimed = orphans + count, reclaimed + size
+
+        verb = 'Would reclaim' if options['dry_run'] else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {scanned} files: {verb} {orphans} orphans, {reclaimed / 1024 / 1024:.2f} MiB ({reclaimed} bytes).'
+        ))
+
+    def reclaim(self, root, batch, options):
+        orphans = set(batch) - referenced_names(list(batch))
+        # An upload reusing a file refreshes its mtime before its submission
+        # commits; check both again right before removing anything.
+        min_age = options['min_age'] * 60
+        orphans = {name for name in orphans if not is_recent(os.path.join(root, name), min_age)}
+        if orphans:
+            orphans -= referenced_names(list(orphans))
+        for stored_name in sorted(orphans):
+            path = os.path.join(root, stored_name)
+            if options['dry_run']:
+                self.stdout.write(f'{stored_name} ({batch[stored_name]} bytes)')
+            elif options['quarantine']:
+                target = os.path.join(options['quarantine'], stored_name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+            else:
+                os.remove(path)
+        return len(orphans), sum(batch[stored_name] for stored_name in orphans)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from forms_builder.models import FormSubmission
+from forms_builder.search import search_index_enabled, update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute the full-text search vector of submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only index submissions of this form id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--missing', action='store_true', help='Only index submissions without a vector')
+
+    def handle(self, *args, **options):
+        if not search_index_enabled():
+            raise CommandError('The search index requires PostgreSQL.')
+        submissions = FormSubmission.objects.all()
+        if options['form']:
+            submissions = submissions.filter(form_id=options['form'])
+        if options['missing']:
+            submissions = submissions.filter(search_vector__isnull=True)
+
+        total = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                submissions.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            total += update_search_vectors(FormSubmission.objects.filter(pk__in=ids))
+            last_pk = ids[-1]
+            self.stdout.write(f'Indexed {total} submissions...')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the search index for {total} submissions.'))
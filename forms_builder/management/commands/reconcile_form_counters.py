@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from forms_builder.counters import STATUS_COUNTERS, reconcile_counters
+from forms_builder.models import Form
+
+
+class Command(BaseCommand):
+    help = 'Recompute the submission counters of forms from the submissions table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only reconcile this form id')
+
+    def handle(self, *args, **options):
+        forms = Form.objects.all()
+        if options['form']:
+            forms = forms.filter(pk=options['form'])
+        fields = ['submission_count', *STATUS_COUNTERS.values()]
+        before = {pk: counts for pk, *counts in forms.values_list('pk', *fields)}
+
+        reconcile_counters(forms)
+
+        drifted = 0
+        for pk, *counts in forms.values_list('pk', *fields):
+            if before.get(pk) != counts:
+                drifted += 1
+                self.stdout.write(self.style.WARNING(f'Form {pk}: {before.get(pk)} -> {counts}'))
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(before)} forms, {drifted} had drifted.'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from forms_builder.conditions import revalidate
+from forms_builder.models import Form
+from forms_builder.schema import get_schema
+
+
+class Command(BaseCommand):
+    help = 'Report stored submissions that break the conditions or required fields of their form'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, help='Only check submissions of this form id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--verbose-ids', action='store_true', help='List the offending submission ids')
+
+    def handle(self, *args, **options):
+        forms = Form.objects.all()
+        if options['form']:
+            forms = forms.filter(pk=options['form'])
+
+        for form in forms.order_by('pk'):
+            schema = get_schema(form)
+            hidden_answers = missing_required = 0
+            for pk, stored_inactive, missing in revalidate(schema, form.submissions.all(), options['batch_size']):
+                hidden_answers += bool(stored_inactive)
+                missing_required += bool(missing)
+                if options['verbose_ids']:
+                    self.stdout.write(
+                        f'  #{pk}: hidden answers {sorted(stored_inactive)}, missing required {missing}'
+                    )
+            self.stdout.write(
+                f'{form.title} (#{form.pk}): {hidden_answers} submissions with hidden answers, '
+                f'{missing_required} missing required answers'
+            )
@@ -0,0 +1,96 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+from django.utils import timezone
+
+from forms_builder.jobs import claim_next_job, evict_expired, fail_job, run_job
+from forms_builder.models import ExportJob, ExportStatus
+
+
+class Command(BaseCommand):
+    help = 'Process queued export jobs with a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker threads')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=60,
+                            help='Requeue jobs left running for more than this many minutes')
+        parser.add_argument('--evict-interval', type=int, default=15,
+                            help='Minutes between deletions of expired export artifacts')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        stale = ExportJob.objects.filter(
+            status=ExportStatus.RUNNING,
+            started_at__lt=timezone.now() - timedelta(minutes=options['stale_after']),
+        ).update(status=ExportStatus.QUEUED, started_at=None, rows_done=0)
+        if stale:
+            self.stdout.write(self.style.WARNING(f'Requeued {stale} stale export jobs.'))
+        self.evict_lock = threading.Lock()
+        self.evicted_at = None
+        self.evict(options)
+
+        threads = [
+            threading.Thread(target=self.work, args=(options,), daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Stopping export workers.'))
+
+    def work(self, options):
+        try:
+            while True:
+                # Drop a connection the database has closed, or that errored,
+                # so that this thread reconnects instead of reusing it forever
+                close_old_connections()
+                try:
+                    job = claim_next_job()
+                except DatabaseError as exc:
+                    self.stderr.write(f'Could not claim an export job: {exc}')
+                    close_old_connections()
+                    time.sleep(options['poll_interval'])
+                    continue
+                if job is None:
+                    if options['once']:
+                        return
+                    self.evict(options)
+                    time.sleep(options['poll_interval'])
+                    continue
+                try:
+                    job = run_job(job)
+                except Exception as exc:
+                    # Usually the database going away; keep the thread alive
+                    self.stderr.write(f'Export job {job.pk} failed: {exc}')
+                    close_old_connections()
+                    try:
+                        fail_job(job, exc)
+                    except DatabaseError:
+                        close_old_connections()
+                    continue
+                style = self.style.SUCCESS if job.status == ExportStatus.DONE else self.style.ERROR
+                self.stdout.write(style(f'Export job {job.pk}: {job.status} ({job.rows_done}/{job.rows_total} rows)'))
+        finally:
+            connections.close_all()
+
+    def evict(self, options):
+        """Delete expired artifacts, at most once per ``--evict-interval`` across the worker threads."""
+        now = time.monotonic()
+        with self.evict_lock:
+            if self.evicted_at is not None and now - self.evicted_at < options['evict_interval'] * 60:
+                return
+            self.evicted_at = now
+        try:
+            evicted = evict_expired()
+        except Exception as exc:
+            self.stderr.write(f'Could not evict expired exports: {exc}')
+            return
+        if evicted:
+            self.stdout.write(f'Evicted {evicted} expired export jobs.')
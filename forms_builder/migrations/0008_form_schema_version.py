@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0007_formfield_background_color"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="form",
+            name="schema_version",
+            field=models.PositiveIntegerField(
+                default=1,
+                editable=False,
+                help_text="Bumped whenever the fields of this form change",
+            ),
+        ),
+    ]
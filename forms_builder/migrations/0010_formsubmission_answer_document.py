@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0009_export_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="answer_document",
+            field=models.JSONField(
+                blank=True,
+                editable=False,
+                help_text="Denormalized {field_id: value_text} copy of the answers; null until backfilled",
+                null=True,
+            ),
+        ),
+    ]
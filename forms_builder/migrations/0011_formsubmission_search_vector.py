@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:04
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0010_formsubmission_answer_document"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="submission_search_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+from django.db.models.functions import Length
+from django.db.models.lookups import LessThanOrEqual
+
+
+def flag_single_submissions(apps, schema_editor):
+    FormSubmission = apps.get_model("forms_builder", "FormSubmission")
+    first_ids = (
+        FormSubmission.objects.filter(
+            form__single_submission=True, submitted_by__isnull=False
+        )
+        .values("form", "submitted_by")
+        .annotate(first_id=Min("id"))
+        .values("first_id")
+    )
+    FormSubmission.objects.filter(id__in=first_ids).update(unique_per_user=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0011_formsubmission_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="unique_per_user",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Copied from Form.single_submission when created; enforces one submission per user",
+            ),
+        ),
+        migrations.RunPython(flag_single_submissions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="form",
+            index=models.Index(
+                fields=["status", "-created_at"], name="form_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="formanswer",
+            index=models.Index(
+                condition=models.Q(LessThanOrEqual(Length("value_text"), 255)),
+                fields=["field", "value_text"],
+                name="answer_field_value_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=models.Index(
+                fields=["form", "submitted_by"], name="submission_form_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=models.Index(
+                fields=["form", "-submitted_at", "-id"],
+                name="submission_form_recent_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="formsubmission",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("unique_per_user", True)),
+                fields=("form", "submitted_by"),
+                name="unique_single_submission_per_user",
+            ),
+        ),
+    ]
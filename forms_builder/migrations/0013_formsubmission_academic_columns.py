@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("academic", "0002_specialite"),
+        ("forms_builder", "0012_hot_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="domaine",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="submissions",
+                to="academic.domaine",
+            ),
+        ),
+        migrations.AddField(
+            model_name="formsubmission",
+            name="etablissement",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="submissions",
+                to="academic.etablissement",
+            ),
+        ),
+        migrations.AddField(
+            model_name="formsubmission",
+            name="faculte",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="submissions",
+                to="academic.faculte",
+            ),
+        ),
+        migrations.AddField(
+            model_name="formsubmission",
+            name="specialite",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="submissions",
+                to="academic.specialite",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=models.Index(
+                fields=["form", "faculte"], name="submission_form_faculte_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:11
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Form = apps.get_model("forms_builder", "Form")
+    FormSubmission = apps.get_model("forms_builder", "FormSubmission")
+
+    def count(**filters):
+        counts = (
+            FormSubmission.objects.filter(form=OuterRef("pk"), **filters)
+            .order_by()
+            .values("form")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    Form.objects.update(
+        submission_count=count(),
+        pending_count=count(status="pending"),
+        approved_count=count(status="approved"),
+        rejected_count=count(status="rejected"),
+        last_submission_at=Subquery(
+            FormSubmission.objects.filter(form=OuterRef("pk"))
+            .order_by("-submitted_at")
+            .values("submitted_at")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0013_formsubmission_academic_columns"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="form",
+            name="approved_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="form",
+            name="last_submission_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="form",
+            name="pending_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="form",
+            name="rejected_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="form",
+            name="submission_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0014_form_submission_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadedfile",
+            name="sha256",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name="exportjob",
+            name="base_url",
+            field=models.CharField(
+                blank=True,
+                help_text="Absolute site URL that uploaded file links are resolved against",
+                max_length=255,
+            ),
+        ),
+    ]
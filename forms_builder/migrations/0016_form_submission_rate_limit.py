@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0015_uploadedfile_sha256"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="form",
+            name="submission_burst",
+            field=models.PositiveIntegerField(
+                default=5,
+                help_text="Submissions one user or IP address may send in a row before the rate applies",
+            ),
+        ),
+        migrations.AddField(
+            model_name="form",
+            name="submission_rate",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Submissions accepted per minute from one user or IP address; 0 disables the limit",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0016_form_submission_rate_limit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="submission_token",
+            field=models.UUIDField(
+                blank=True,
+                editable=False,
+                help_text="Token of the rendered form that last wrote this submission; replayed POSTs are recognised by it",
+                null=True,
+                unique=True,
+            ),
+        ),
+    ]
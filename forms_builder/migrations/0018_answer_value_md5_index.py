@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:41
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0017_formsubmission_submission_token"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="formanswer",
+            name="answer_field_value_idx",
+        ),
+        migrations.AddIndex(
+            model_name="formanswer",
+            index=models.Index(
+                models.F("field"),
+                django.db.models.functions.text.MD5("value_text"),
+                name="answer_field_value_md5_idx",
+            ),
+        ),
+    ]
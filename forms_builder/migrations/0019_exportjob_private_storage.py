@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:42
+
+import forms_builder.models
+from django.core.files.storage import storages
+from django.db import migrations, models
+
+
+def move_artifacts(apps, schema_editor):
+    """Move existing artifacts out of the public media storage."""
+    ExportJob = apps.get_model("forms_builder", "ExportJob")
+    public = storages["default"]
+    private = forms_builder.models.export_storage()
+    if public is private:
+        return
+    for name in ExportJob.objects.exclude(file="").values_list("file", flat=True):
+        if public.exists(name) and not private.exists(name):
+            with public.open(name) as artifact:
+                private.save(name, artifact)
+            public.delete(name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms_builder", "0018_answer_value_md5_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="exportjob",
+            name="file",
+            field=models.FileField(
+                blank=True,
+                storage=forms_builder.models.export_storage,
+                upload_to="exports/",
+            ),
+        ),
+        migrations.RunPython(move_artifacts, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.core.files.storage import storages
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import MD5
 from django.utils.text import slugify
 import uuid
 
@@ -43,6 +48,18 @@ class FieldType(models.TextChoices):
     PANEL = 'panel', 'Panel (Field Group)'
 
 
+class ExportFormat(models.TextChoices):
+    CSV = 'csv', 'CSV'
+    EXCEL = 'xlsx', 'Excel'
+
+
+class ExportStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    RUNNING = 'running', 'Running'
+    DONE = 'done', 'Done'
+    FAILED = 'failed', 'Failed'
+
+
 class SubmissionStatus(models.TextChoices):
     PENDING = 'pending', 'Pending'
     APPROVED = 'approved', 'Approved'
@@ -58,13 +75,29 @@ class Form(models.Model):
     access_level = models.CharField(max_length=20, choices=FormAccess.choices, default=FormAccess.PUBLIC)
     allow_update = models.BooleanField(default=False, help_text='Allow authenticated users to update their submission')
     single_submission = models.BooleanField(default=False, help_text='Allow only one submission per user')
+    submission_rate = models.PositiveIntegerField(
+        default=0, help_text='Submissions accepted per minute from one user or IP address; 0 disables the limit'
+    )
+    submission_burst = models.PositiveIntegerField(
+        default=5, help_text='Submissions one user or IP address may send in a row before the rate applies'
+    )
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_forms')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     image = models.ImageField(upload_to='form_images/', blank=True, null=True, help_text='Upload an image for this form')
+    schema_version = models.PositiveIntegerField(default=1, editable=False, help_text='Bumped whenever the fields of this form change')
+    # Maintained by forms_builder.counters; `manage.py reconcile_form_counters` rebuilds them
+    submission_count = models.PositiveIntegerField(default=0, editable=False)
+    pending_count = models.PositiveIntegerField(default=0, editable=False)
+    approved_count = models.PositiveIntegerField(default=0, editable=False)
+    rejected_count = models.PositiveIntegerField(default=0, editable=False)
+    last_submission_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='form_status_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -106,13 +139,53 @@ class FormField(models.Model):
 class FormSubmission(models.Model):
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='submissions')
     submitted_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     submitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='submissions')
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=SubmissionStatus.choices, default=SubmissionStatus.PENDING)
+    answer_document = models.JSONField(
+        null=True, blank=True, editable=False,
+        help_text='Denormalized {field_id: value_text} copy of the answers; null until backfilled'
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Academic choices copied from the select_* answers, for indexed filtering
+    etablissement = models.ForeignKey(
+        'academic.Etablissement', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='submissions'
+    )
+    faculte = models.ForeignKey(
+        'academic.Faculte', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='submissions'
+    )
+    domaine = models.ForeignKey(
+        'academic.Domaine', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='submissions'
+    )
+    specialite = models.ForeignKey(
+        'academic.Specialite', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='submissions'
+    )
+    unique_per_user = models.BooleanField(
+        default=False, editable=False,
+        help_text='Copied from Form.single_submission when created; enforces one submission per user'
+    )
+    submission_token = models.UUIDField(
+        null=True, blank=True, unique=True, editable=False,
+        help_text='Token of the rendered form that last wrote this submission; replayed POSTs are recognised by it'
+    )
 
     class Meta:
         ordering = ['-submitted_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='submission_search_idx'),
+            models.Index(fields=['form', 'submitted_by'], name='submission_form_user_idx'),
+            models.Index(fields=['form', '-submitted_at', '-id'], name='submission_form_recent_idx'),
+            models.Index(fields=['form', 'faculte'], name='submission_form_faculte_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['form', 'submitted_by'],
+                condition=models.Q(unique_per_user=True),
+                name='unique_single_submission_per_user',
+            ),
+        ]
 
     def __str__(self):
         return f"Submission {self.id} for {self.form.title}"
@@ -124,6 +197,13 @@ class FormAnswer(models.Model):
     value_text = models.TextField(blank=True)
     value_json = models.JSONField(default=dict, blank=True)
 
+    class Meta:
+        indexes = [
+            # Answers are looked up by the hash of their value: long texts
+            # would exceed the btree row size
+            models.Index('field', MD5('value_text'), name='answer_field_value_md5_idx'),
+        ]
+
     def __str__(self):
         return f"Answer for {self.field.label}"
 
@@ -135,7 +215,39 @@ class UploadedFile(models.Model):
     stored_filename = models.CharField(max_length=255)
     content_type = models.CharField(max_length=100)
     size_bytes = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.original_filename
+
+
+def export_storage():
+    """The storage of export artifacts, ``FORMS_BUILDER_EXPORT_STORAGE`` in ``STORAGES``.
+
+    It must not be served publicly: ``export_job_download`` checks access.
+    """
+    return storages[getattr(settings, 'FORMS_BUILDER_EXPORT_STORAGE', 'default')]
+
+
+class ExportJob(models.Model):
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='export_jobs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    export_format = models.CharField(max_length=10, choices=ExportFormat.choices, default=ExportFormat.CSV)
+    filters = models.JSONField(default=dict, blank=True)
+    cache_key = models.CharField(max_length=64, db_index=True)
+    base_url = models.CharField(max_length=255, blank=True, help_text='Absolute site URL that uploaded file links are resolved against')
+    status = models.CharField(max_length=20, choices=ExportStatus.choices, default=ExportStatus.QUEUED)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_done = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', storage=export_storage, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_export_format_display()} export {self.id} for {self.form.title}"
@@ -0,0 +1,75 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.db.models import Q
+
+
+SUBMISSION_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _cursor_value(key, value):
+    """Convert the JSON ``value`` of ``key`` back to its column type; ``ValueError`` if it does not fit."""
+    if key.endswith('_at'):
+        if not isinstance(value, str):
+            raise ValueError(key)
+        return datetime.datetime.fromisoformat(value)
+    if key == 'id':
+        if type(value) is not int:
+            raise ValueError(key)
+        return value
+    if type(value) not in (int, float):
+        raise ValueError(key)
+    return value
+
+
+def decode_cursor(cursor, keys):
+    """Decode a cursor from ``encode_cursor`` into values of ``keys``.
+
+    Invalid or tampered cursors give ``None``, restarting at the first page.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        return [_cursor_value(key, value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+def _after(keys, values):
+    """Condition selecting the rows after ``values`` in descending ``keys`` order."""
+    condition = Q()
+    for index in reversed(range(len(keys))):
+        equal = {key: value for key, value in zip(keys[:index], values[:index])}
+        condition |= Q(**equal, **{f'{keys[index]}__lt': values[index]})
+    return condition
+
+
+def keyset_page(rows, keys, cursor=None, size=SUBMISSION_PAGE_SIZE):
+    """Return one page of ``rows`` in descending ``keys`` order and the cursor of the next one.
+
+    ``keys`` must end with a unique column so every row has a distinct
+    position. The next cursor is ``None`` on the last page.
+    """
+    values = decode_cursor(cursor, keys)
+    rows = rows.order_by(*[f'-{key}' for key in keys])
+    if values:
+        rows = rows.filter(_after(keys, values))
+    page = list(rows[:size + 1])
+    if len(page) <= size:
+        return page, None
+    page = page[:size]
+    last = page[-1]
+    return page, encode_cursor([
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in (getattr(last, key) for key in keys)
+    ])
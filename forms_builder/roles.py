@@ -0,0 +1,128 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+
+SESSION_KEY = '_forms_builder_roles'
+ADMIN_ROLES = frozenset({'admin'})
+FIELD_ADMIN_ROLES = frozenset({'admin', 'facadmin'})
+VERSION_KEY = 'forms_builder:roles:version'
+
+
+def _user_version_key(user_id):
+    return f'{VERSION_KEY}:{user_id}'
+
+
+LOCAL_VERSIONS = 10000
+# Version key -> (version, monotonic time it was read), most recent last
+_local_versions = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _remember_versions(versions, now):
+    with _local_lock:
+        for key, version in versions.items():
+            _local_versions[key] = (version, now)
+            _local_versions.move_to_end(key)
+        while len(_local_versions) > LOCAL_VERSIONS:
+            _local_versions.popitem(last=False)
+
+
+def _version(user_id):
+    """The global and per-user role versions.
+
+    Each process reads them from the cache at most once every
+    ``FORMS_BUILDER_ROLE_VERSION_TTL`` seconds.
+    """
+    keys = [VERSION_KEY, _user_version_key(user_id)]
+    now = time.monotonic()
+    ttl = getattr(settings, 'FORMS_BUILDER_ROLE_VERSION_TTL', 10)
+    with _local_lock:
+        local = {key: _local_versions.get(key) for key in keys}
+    stale = [key for key, entry in local.items() if entry is None or now - entry[1] >= ttl]
+    if stale:
+        fetched = cache.get_many(stale)
+        versions = {key: fetched.get(key) for key in stale}
+        _remember_versions(versions, now)
+        local.update((key, (version, now)) for key, version in versions.items())
+    return [local[key][0] for key in keys]
+
+
+def invalidate_roles(user_ids=None):
+    """Make cached role sets stale, for ``user_ids`` or for every user.
+
+    This process sees the new versions at once, the others through the shared
+    cache within ``FORMS_BUILDER_ROLE_VERSION_TTL`` seconds.
+    """
+    keys = [VERSION_KEY] if user_ids is None else [_user_version_key(user_id) for user_id in user_ids]
+    versions = {key: uuid.uuid4().hex for key in keys}
+    cache.set_many(versions, None)
+    _remember_versions(versions, time.monotonic())
+
+
+def _resolve_roles(request):
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+
+    session = getattr(request, 'session', None)
+    version = _version(user.pk)
+    if session is not None:
+        cached = session.get(SESSION_KEY)
+        if (cached and cached['user'] == user.pk and cached['version'] == version
+                and cached['expires'] > time.time()):
+            return frozenset(cached['roles'])
+
+    roles = frozenset(user.groups.values_list('name', flat=True))
+    if session is not None:
+        session[SESSION_KEY] = {
+            'user': user.pk,
+            'roles': sorted(roles),
+            'version': version,
+            'expires': time.time() + getattr(settings, 'FORMS_BUILDER_ROLE_CACHE_TTL', 300),
+        }
+    return roles
+
+
+def get_roles(request):
+    """Group names of the current user, computed at most once per request."""
+    if not hasattr(request, 'user_roles'):
+        request.user_roles = SimpleLazyObject(lambda: _resolve_roles(request))
+    return request.user_roles
+
+
+def is_form_admin(request):
+    return request.user.is_staff or not ADMIN_ROLES.isdisjoint(get_roles(request))
+
+
+def can_edit_admin_fields(request):
+    return request.user.is_authenticated and (
+        request.user.is_staff or not FIELD_ADMIN_ROLES.isdisjoint(get_roles(request))
+    )
+
+
+class RoleMiddleware:
+    """Attach a lazily resolved ``request.user_roles`` set of group names.
+
+    The set is kept in the session for ``FORMS_BUILDER_ROLE_CACHE_TTL``
+    seconds and dropped early when the user's groups change. Nothing is
+    resolved here, so the middleware runs as is under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        get_roles(request)
+        return self.get_response(request)
@@ -0,0 +1,142 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .conditions import ConditionSet
+from .models import Form, FormField, FieldType
+from .validation import compile_validators
+
+
+ACADEMIC_FIELD_TYPES = (
+    FieldType.SELECT_ETABLISSEMENT,
+    FieldType.SELECT_FACULTE,
+    FieldType.SELECT_DOMAINE,
+    FieldType.SELECT_SPECIALITE,
+)
+
+# select_* field type -> (FormSubmission column, academic tree key)
+ACADEMIC_COLUMNS = {
+    FieldType.SELECT_ETABLISSEMENT: ('etablissement_id', 'etablissements'),
+    FieldType.SELECT_FACULTE: ('faculte_id', 'facultes'),
+    FieldType.SELECT_DOMAINE: ('domaine_id', 'domaines'),
+    FieldType.SELECT_SPECIALITE: ('specialite_id', 'specialites'),
+}
+
+# form_id -> FormSchema, holding the newest compiled version of each form
+_compiled = {}
+
+
+class FormSchema:
+    """Compiled, read-only view of a form's fields for one schema version.
+
+    Shared between requests, so nothing here (including the field instances
+    it holds) may be mutated after construction.
+    """
+
+    def __init__(self, form_id, version, fields):
+        self.form_id = form_id
+        self.version = version
+        self.fields = tuple(fields)
+        self.by_id = {field.id: field for field in self.fields}
+        self.by_name = {field.name: field for field in self.fields}
+
+        by_type = {}
+        for field in self.fields:
+            by_type.setdefault(field.field_type, []).append(field)
+        self.by_type = {field_type: tuple(items) for field_type, items in by_type.items()}
+
+        panel_ids = {field.id for field in self.by_type.get(FieldType.PANEL, ())}
+        children = {panel_id: [] for panel_id in panel_ids}
+        standalone = []
+        for field in self.fields:
+            if field.field_type == FieldType.PANEL:
+                continue
+            elif field.parent_field_id in panel_ids:
+                children[field.parent_field_id].append(field)
+            else:
+                standalone.append(field)
+        for panel in self.by_type.get(FieldType.PANEL, ()):
+            panel.panel_fields = tuple(children[panel.id])
+        self.panels = self.by_type.get(FieldType.PANEL, ())
+        self.standalone_fields = tuple(standalone)
+        self.panel_of = {
+            field.id: field.parent_field_id for field in self.fields if field.parent_field_id in panel_ids
+        }
+
+        for field in self.fields:
+            field.visible_condition_json = json.dumps(field.visible_condition or {})
+            field.enabled_condition_json = json.dumps(field.enabled_condition or {})
+        self.conditions = ConditionSet(self.fields)
+        self.validators = compile_validators(self.fields)
+
+        # Cascading selects: field_id -> {parentValue: (option, ...)}
+        self.child_options = {}
+        for field in self.fields:
+            index = {}
+            for option in field.options_json or ():
+                if isinstance(option, dict) and option.get('parentValue') is not None:
+                    index.setdefault(option['parentValue'], []).append(option)
+            if index:
+                self.child_options[field.id] = {value: tuple(items) for value, items in index.items()}
+
+    def options_for(self, field_id, parent_value):
+        """Options of a cascading select whose ``parentValue`` is ``parent_value``."""
+        return self.child_options.get(field_id, {}).get(parent_value, ())
+
+    def fields_of_type(self, *field_types):
+        if len(field_types) == 1:
+            return self.by_type.get(field_types[0], ())
+        return tuple(field for field in self.fields if field.field_type in field_types)
+
+    def has_type(self, field_type):
+        return field_type in self.by_type
+
+    @property
+    def file_fields(self):
+        return self.fields_of_type(FieldType.FILE)
+
+    @property
+    def checkbox_fields(self):
+        return self.fields_of_type(FieldType.CHECKBOX)
+
+    @property
+    def academic_fields(self):
+        return self.fields_of_type(*ACADEMIC_FIELD_TYPES)
+
+
+def _cache_key(form_id, version):
+    return f'forms_builder:schema:{form_id}:{version}'
+
+
+def _remember(form, fields):
+    schema = _compiled.get(form.pk)
+    compiled = FormSchema(form.pk, form.schema_version, fields)
+    if schema is None or compiled.version >= schema.version:
+        _compiled[form.pk] = compiled
+    return compiled
+
+
+def get_schema(form):
+    """Return the compiled schema for ``form`` at its current schema version."""
+    schema = _compiled.get(form.pk)
+    if schema is not None and schema.version == form.schema_version:
+        return schema
+
+    key = _cache_key(form.pk, form.schema_version)
+    fields = cache.get(key)
+    if fields is None:
+        fields = list(FormField.objects.filter(form_id=form.pk).order_by('order', 'id'))
+        cache.set(key, fields, getattr(settings, 'FORMS_BUILDER_SCHEMA_CACHE_TIMEOUT', 3600))
+    return _remember(form, fields)
+
+
+def bump_schema_version(form):
+    """Invalidate every cached schema of ``form`` after its fields changed."""
+    Form.objects.filter(pk=form.pk).update(
+        schema_version=F('schema_version') + 1, updated_at=timezone.now()
+    )
+    form.refresh_from_db(fields=['schema_version', 'updated_at'])
+    return form.schema_version
@@ -0,0 +1,81 @@
+import re
+
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Exists, F, FloatField, OuterRef, Q, StringAgg, Subquery, TextField, Value
+from django.db.models.functions import Coalesce, Concat
+
+from .models import FormSubmission, FormAnswer
+
+
+SEARCH_CONFIG = 'simple'
+
+
+def search_index_enabled():
+    """The tsvector index only exists on PostgreSQL."""
+    return connection.vendor == 'postgresql'
+
+
+def _search_vector():
+    user_text = User.objects.filter(pk=OuterRef('submitted_by_id')).annotate(
+        text=Concat(
+            'username', Value(' '), 'first_name', Value(' '), 'last_name', Value(' '), 'email',
+            output_field=TextField(),
+        )
+    ).values('text')
+    answers_text = FormAnswer.objects.filter(submission=OuterRef('pk')).values('submission').annotate(
+        text=StringAgg('value_text', delimiter=Value(' '))
+    ).values('text')
+    return (
+        SearchVector(_text_or_empty(user_text), config=SEARCH_CONFIG, weight='A')
+        + SearchVector(_text_or_empty(answers_text), config=SEARCH_CONFIG, weight='B')
+    )
+
+
+def _text_or_empty(subquery):
+    return Coalesce(Subquery(subquery), Value(''), output_field=TextField())
+
+
+def search_vector_update():
+    """``update()`` keyword arguments recomputing the search vector from the stored rows."""
+    return {'search_vector': _search_vector()} if search_index_enabled() else {}
+
+
+def update_search_vectors(submissions):
+    """Recompute the search vector of ``submissions`` with a single UPDATE."""
+    if not search_index_enabled():
+        return 0
+    return submissions.update(**search_vector_update())
+
+
+def index_submission(submission_id):
+    return update_search_vectors(FormSubmission.objects.filter(pk=submission_id))
+
+
+def search_query(text):
+    """Match the whole phrase as typed, or every word as a prefix."""
+    words = re.findall(r'\w+', text)
+    query = SearchQuery(text, search_type='plain', config=SEARCH_CONFIG)
+    if words:
+        prefixes = ' & '.join(f'{word}:*' for word in words)
+        query |= SearchQuery(prefixes, search_type='raw', config=SEARCH_CONFIG)
+    return query
+
+
+def search_submissions(submissions, text):
+    """Filter ``submissions`` through the search index and annotate a ``rank``.
+
+    Submissions indexed before the vector existed are matched with the old
+    substring search until ``rebuild_search_index`` has been run.
+    """
+    query = search_query(text)
+    unindexed = FormAnswer.objects.filter(submission=OuterRef('pk'), value_text__icontains=text)
+    return submissions.filter(
+        Q(search_vector=query) |
+        Q(search_vector__isnull=True) & (
+            Q(submitted_by__username__icontains=text) |
+            Q(submitted_by__email__icontains=text) |
+            Q(Exists(unindexed))
+        )
+    ).annotate(rank=Coalesce(SearchRank(F('search_vector'), query), Value(0.0), output_field=FloatField()))
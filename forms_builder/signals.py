@@ -0,0 +1,23 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .roles import invalidate_roles
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, User):
+        invalidate_roles([instance.pk])
+    elif pk_set:
+        invalidate_roles(pk_set)
+    else:
+        # group.user_set.clear() does not report which users were removed
+        invalidate_roles()
+
+
+@receiver([post_save, post_delete], sender=Group)
+def group_changed(sender, **kwargs):
+    invalidate_roles()
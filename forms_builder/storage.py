@@ -0,0 +1,120 @@
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import storages
+
+from django.db.models.functions import MD5
+
+from .models import FormAnswer, FormField, UploadedFile, FieldType
+
+
+UPLOAD_DIR = 'uploads'
+
+
+def upload_storage():
+    """The storage holding FILE answers, ``FORMS_BUILDER_UPLOAD_STORAGE`` in ``STORAGES``."""
+    return storages[getattr(settings, 'FORMS_BUILDER_UPLOAD_STORAGE', 'default')]
+
+
+def upload_path(stored_name):
+    return f'{UPLOAD_DIR}/{stored_name}'
+
+
+def upload_url(stored_name):
+    return upload_storage().url(upload_path(stored_name))
+
+
+def content_name(sha256, filename):
+    """Sharded content-addressed name, ``ab/cd/abcd….ext``, relative to the upload directory."""
+    extension = os.path.splitext(filename)[1].lower()[:16]
+    return f'{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def store_upload(uploaded_file):
+    """Store ``uploaded_file`` under its content hash and return ``(stored_name, sha256, size)``.
+
+    The upload is hashed in chunks; Django has already spooled large uploads
+    to a temporary file, so nothing is held in memory. Content that is
+    already stored is not written again, but its modification time is
+    refreshed so that ``gc_uploads --min-age`` treats it as in flight until
+    the submission reusing it commits.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+        size += len(chunk)
+    sha256 = hasher.hexdigest()
+
+    stored_name = content_name(sha256, uploaded_file.name)
+    storage = upload_storage()
+    if not storage.exists(upload_path(stored_name)):
+        uploaded_file.seek(0)
+        saved = storage.save(upload_path(stored_name), uploaded_file)
+        # A concurrent upload of the same content may have won the name
+        stored_name = saved[len(UPLOAD_DIR) + 1:]
+    else:
+        touch(storage, upload_path(stored_name))
+    return stored_name, sha256, size
+
+
+def touch(storage, name):
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storages are not garbage collected by gc_uploads
+        return
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def is_recent(path, min_age):
+    """Whether the file at ``path`` was modified in the last ``min_age`` seconds (or is gone)."""
+    try:
+        return os.stat(path).st_mtime > time.time() - min_age
+    except FileNotFoundError:
+        return True
+
+
+def iter_stored_files(root, min_age=0):
+    """Yield ``(stored_name, size)`` for every file under ``root``, walking it with ``os.scandir``.
+
+    Files modified in the last ``min_age`` seconds are skipped: uploads are
+    written before their submission's transaction commits.
+    """
+    cutoff = time.time() - min_age
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime <= cutoff:
+                        yield os.path.relpath(entry.path, root).replace(os.sep, '/'), stat.st_size
+
+
+def file_answers(stored_names):
+    """FILE answers whose value is one of ``stored_names``, found through ``answer_field_value_md5_idx``."""
+    return FormAnswer.objects.alias(value_md5=MD5('value_text')).filter(
+        field__in=FormField.objects.filter(field_type=FieldType.FILE).values('pk'),
+        value_md5__in=[hashlib.md5(name.encode()).hexdigest() for name in stored_names],
+        value_text__in=stored_names,
+    )
+
+
+def referenced_names(stored_names):
+    """The subset of ``stored_names`` still used by an UploadedFile row or a FILE answer."""
+    referenced = set(
+        UploadedFile.objects.filter(stored_filename__in=stored_names).values_list('stored_filename', flat=True)
+    )
+    remaining = set(stored_names) - referenced
+    if remaining:
+        referenced.update(file_answers(remaining).values_list('value_text', flat=True))
+    return referenced
@@ -0,0 +1,229 @@
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from academic import hierarchy
+
+from .counters import record_submission
+from .documents import build_document
+from .models import FormSubmission, FormAnswer, UploadedFile, FieldType
+from .roles import can_edit_admin_fields
+from .schema import ACADEMIC_COLUMNS
+from .search import index_submission, search_vector_update
+from .storage import store_upload
+
+
+def academic_columns(answers, tree=None):
+    """Map ``(field_type, value_text)`` answers to the academic FK columns of a submission.
+
+    Every column is returned, ``None`` when the form has no such field or the
+    answer is not the id of an existing row. Pass the academic ``tree`` when
+    mapping many submissions; otherwise it is read once per call.
+    """
+    columns = {column: None for column, _ in ACADEMIC_COLUMNS.values()}
+    for field_type, value_text in answers:
+        if field_type in ACADEMIC_COLUMNS and value_text and value_text.isdigit():
+            column, kind = ACADEMIC_COLUMNS[field_type]
+            tree = tree or hierarchy.get_tree()
+            if hierarchy.contains(kind, int(value_text), tree):
+                columns[column] = int(value_text)
+    return columns
+
+
+def submission_token(request):
+    """The ``submission_token`` posted with the form as a UUID, ``None`` when missing or malformed."""
+    try:
+        return uuid.UUID(request.POST.get('submission_token', ''))
+    except ValueError:
+        return None
+
+
+class SubmissionWriter:
+    """Builds every answer and file row of a submission in memory and
+    persists them in a single transaction.
+
+    New submissions are written with one ``bulk_create`` per table. Updates
+    are diffed against the stored answers so only changed rows are written.
+    """
+
+    def __init__(self, form, schema, request):
+        self.form = form
+        self.schema = schema
+        self.fields = schema.fields
+        self.request = request
+        self.answers = {}  # field_id -> (value_text, value_json)
+        self.files = {}  # field_id -> UploadedFile (unsaved)
+        self.errors = {}  # field_id -> message
+        self.token = submission_token(request)
+
+    def collect(self):
+        """Read and check the posted values, then store uploads.
+
+        Answers of fields hidden or disabled by their conditions are dropped;
+        the remaining fields are checked against ``is_required`` and their
+        compiled ``validation_json``. When ``errors`` is set nothing has been
+        stored. Files are stored before the transaction is opened so the
+        database connection is not held while copying upload chunks.
+        """
+        post = self.request.POST
+        for field in self.fields:
+            key = f'field_{field.id}'
+            if field.field_type in (FieldType.PANEL, FieldType.FILE):
+                continue
+            elif field.field_type == FieldType.CHECKBOX:
+                values = post.getlist(key)
+                self.answers[field.id] = (','.join(values), {'values': values})
+            else:
+                self.answers[field.id] = (post.get(key, ''), {})
+
+        inactive = self.schema.conditions.inactive(self.values()) if self.schema.conditions else frozenset()
+        for field_id in inactive:
+            self.answers.pop(field_id, None)
+
+        uploads = {}
+        for field in self.schema.file_fields:
+            if field.id in inactive:
+                continue
+            uploaded_file = self.request.FILES.get(f'field_{field.id}')
+            existing_file = post.get(f'existing_file_{field.id}')
+            if uploaded_file:
+                uploads[field] = uploaded_file
+            elif existing_file:
+                self.answers[field.id] = (existing_file, {})
+
+        self._validate(inactive, uploads)
+        if self.errors:
+            return self
+
+        for field, uploaded_file in uploads.items():
+            stored_name, sha256, size = store_upload(uploaded_file)
+            self.files[field.id] = UploadedFile(
+                field=field,
+                original_filename=uploaded_file.name,
+                stored_filename=stored_name,
+                content_type=uploaded_file.content_type or '',
+                size_bytes=size,
+                sha256=sha256,
+            )
+            self.answers[field.id] = (stored_name, {})
+        return self
+
+    def _validate(self, inactive, uploads):
+        """Check every shown field in one pass, filling ``errors``."""
+        readonly = None
+        for field in self.fields:
+            if field.id in inactive or field.field_type == FieldType.PANEL:
+                continue
+            validator = self.schema.validators[field.id]
+            if field in uploads:
+                error = validator.check_upload(uploads[field])
+            elif field.field_type != FieldType.FILE and self.answers[field.id][0]:
+                error = validator(*self.answers[field.id])
+            elif field.is_required and not self.answers.get(field.id, ('',))[0]:
+                if field.admin_only:
+                    # Read-only for non-admins, who cannot fill it in
+                    if readonly is None:
+                        readonly = not can_edit_admin_fields(self.request)
+                    if readonly:
+                        continue
+                error = 'This field is required.'
+            else:
+                continue
+            if error:
+                self.errors[field.id] = error
+
+    def values(self):
+        """The collected answers as ``{field_id: value_text}``."""
+        return {field_id: text for field_id, (text, _) in self.answers.items()}
+
+    def document(self):
+        return build_document((field_id, text) for field_id, (text, _) in self.answers.items())
+
+    def academic_columns(self):
+        field_types = {field.id: field.field_type for field in self.fields}
+        return academic_columns((field_types[field_id], text) for field_id, (text, _) in self.answers.items())
+
+    def create(self):
+        """Insert a new submission with all of its answers and files."""
+        user = self.request.user
+        with transaction.atomic():
+            submission = FormSubmission.objects.create(
+                form=self.form,
+                submitted_by=user if user.is_authenticated else None,
+                ip_address=self.request.META.get('REMOTE_ADDR'),
+                user_agent=self.request.META.get('HTTP_USER_AGENT', '')[:500],
+                answer_document=self.document(),
+                unique_per_user=self.form.single_submission and user.is_authenticated,
+                submission_token=self.token,
+                **self.academic_columns(),
+            )
+            FormAnswer.objects.bulk_create([
+                FormAnswer(submission=submission, field_id=field_id, value_text=text, value_json=data)
+                for field_id, (text, data) in self.answers.items()
+            ])
+            self._create_files(submission, self.files.values())
+            index_submission(submission.pk)
+            record_submission(submission)
+        return submission
+
+    def update(self, submission):
+        """Write only the answers and files that differ from ``submission``."""
+        with transaction.atomic():
+            existing = {}
+            stale_answer_ids = []
+            for answer in submission.answers.select_for_update():
+                if answer.field_id in existing:
+                    stale_answer_ids.append(answer.pk)
+                else:
+                    existing[answer.field_id] = answer
+
+            to_create = []
+            to_update = []
+            for field_id, (text, data) in self.answers.items():
+                answer = existing.pop(field_id, None)
+                if answer is None:
+                    to_create.append(FormAnswer(
+                        submission=submission, field_id=field_id, value_text=text, value_json=data
+                    ))
+                elif answer.value_text != text or answer.value_json != data:
+                    answer.value_text = text
+                    answer.value_json = data
+                    to_update.append(answer)
+            stale_answer_ids.extend(answer.pk for answer in existing.values())
+
+            if stale_answer_ids:
+                FormAnswer.objects.filter(pk__in=stale_answer_ids).delete()
+            if to_update:
+                FormAnswer.objects.bulk_update(to_update, ['value_text', 'value_json'])
+            if to_create:
+                FormAnswer.objects.bulk_create(to_create)
+
+            # Keep the file rows that still back an answer, including re-uploads
+            # of identical content; drop replaced ones.
+            new_files = dict(self.files)
+            stale_file_ids = []
+            for uploaded_file in submission.files.all():
+                new_file = new_files.get(uploaded_file.field_id)
+                if new_file and (new_file.stored_filename, new_file.original_filename) == (
+                    uploaded_file.stored_filename, uploaded_file.original_filename
+                ):
+                    del new_files[uploaded_file.field_id]
+                elif new_file or self.answers.get(uploaded_file.field_id, ('',))[0] != uploaded_file.stored_filename:
+                    stale_file_ids.append(uploaded_file.pk)
+            if stale_file_ids:
+                UploadedFile.objects.filter(pk__in=stale_file_ids).delete()
+            self._create_files(submission, new_files.values())
+            submission.answer_document = self.document()
+            FormSubmission.objects.filter(pk=submission.pk).update(
+                answer_document=submission.answer_document, updated_at=timezone.now(), submission_token=self.token,
+                **self.academic_columns(), **search_vector_update()
+            )
+        return submission
+
+    def _create_files(self, submission, files):
+        files = list(files)
+        for uploaded_file in files:
+            uploaded_file.submission = submission
+        if files:
+            UploadedFile.objects.bulk_create(files)
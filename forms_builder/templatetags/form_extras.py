@@ -1,5 +1,7 @@
 from django import template
 
+from forms_builder.storage import upload_url as _upload_url
+
 register = template.Library()
 
 
@@ -14,3 +16,9 @@ def get_item(dictionary, key):
 def is_field_readonly(field, is_admin_user):
     """Returns True if field is admin_only and user is not admin"""
     return field.admin_only and not is_admin_user
+
+
+@register.filter
+def upload_url(stored_name):
+    """URL of a stored FILE answer in the upload storage"""
+    return _upload_url(stored_name) if stored_name else ''
@@ -1,3 +1,1132 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.contrib import admin
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from academic import hierarchy
+from academic.models import Domaine, Faculte
+
+from . import instrumentation, roles, throttling
+from .documents import build_document
+from .exports import filter_submissions, iter_export_rows, write_excel
+from .jobs import evict_expired, request_export, run_job
+from .management.commands import run_export_worker
+from .pagination import encode_cursor, keyset_page
+from .admin import FormSubmissionAdmin
+from .models import (
+    Form, FormField, FormSubmission, FormAnswer, FormStatus, FieldType, ExportFormat, ExportJob, ExportStatus,
+    SubmissionStatus,
+)
+from .schema import _compiled, bump_schema_version, get_schema
+from .submissions import academic_columns
+from .search import search_submissions
+from .storage import file_answers, store_upload, upload_path, upload_storage
+
+# For counting queries without those of a database cache backend
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL')
+class HotQueryPlanTests(TestCase):
+    """The hot queries must stay index scans on a realistically sized dataset."""
+
+    FORMS = 2000
+    SUBMISSIONS = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'user{i}') for i in range(500)])
+        forms = Form.objects.bulk_create([
+            Form(title=f'Form {i}', slug=f'form-{i}', created_by=cls.users[0],
+                 status=FormStatus.PUBLISHED if i % 50 == 0 else FormStatus.DRAFT)
+            for i in range(cls.FORMS)
+        ])
+        cls.form = forms[0]
+        cls.faculty_field = FormField.objects.create(
+            form=cls.form, name='faculte', label='Faculte', field_type=FieldType.SELECT_FACULTE
+        )
+        notes_field = FormField.objects.create(form=cls.form, name='notes', label='Notes', field_type=FieldType.TEXTAREA)
+        file_field = FormField.objects.create(form=cls.form, name='bac', label='Bac', field_type=FieldType.FILE)
+        faculties = Faculte.objects.bulk_create([Faculte(nom=f'Faculte {i}') for i in range(12)])
+        submissions = FormSubmission.objects.bulk_create([
+            FormSubmission(form=forms[i % 20], submitted_by=cls.users[i % len(cls.users)],
+                           faculte=faculties[i % len(faculties)])
+            for i in range(cls.SUBMISSIONS)
+        ])
+        cls.faculty = faculties[3]
+        form_submissions = [submission for submission in submissions if submission.form_id == cls.form.pk]
+        FormAnswer.objects.bulk_create(
+            [FormAnswer(submission=s, field=cls.faculty_field, value_text=str(i % 12)) for i, s in enumerate(form_submissions)]
+            + [FormAnswer(submission=s, field=notes_field, value_text='x' * 300) for s in form_submissions]
+            + [FormAnswer(submission=s, field=file_field, value_text=f'{i:064x}.pdf') for i, s in enumerate(form_submissions)]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_published_forms(self):
+        self.assertUsesIndex(Form.objects.filter(status=FormStatus.PUBLISHED), 'form_status_idx')
+
+    def test_existing_submission_lookup(self):
+        queryset = FormSubmission.objects.filter(form=self.form, submitted_by=self.users[3])
+        self.assertRegex(queryset.explain(), 'submission_form_user_idx|unique_single_submission_per_user')
+
+    def test_recent_submissions(self):
+        queryset = FormSubmission.objects.filter(form=self.form).order_by('-submitted_at', '-id')[:50]
+        self.assertUsesIndex(queryset, 'submission_form_recent_idx')
+
+    def test_faculty_filter(self):
+        queryset = filter_submissions(FormSubmission.objects.filter(form=self.form), {'faculty': str(self.faculty.pk)})
+        self.assertUsesIndex(queryset, 'submission_form_faculte_idx')
+
+    def test_file_answer_lookup(self):
+        self.assertUsesIndex(file_answers([f'{7:064x}.pdf', f'{8:064x}.pdf']), 'answer_field_value_md5_idx')
+
+    def test_long_answers_can_be_indexed(self):
+        answer = FormAnswer.objects.filter(field__field_type=FieldType.TEXTAREA).first()
+        # Incompressible, so that it would overflow a btree entry on value_text itself
+        answer.value_text = os.urandom(5000).hex()
+        answer.save()
+        self.assertEqual(FormAnswer.objects.get(pk=answer.pk).value_text, answer.value_text)
+
+
+class SingleSubmissionConstraintTests(TestCase):
+
+    def test_second_submission_is_rejected(self):
+        user = User.objects.create(username='student')
+        form = Form.objects.create(title='Inscription', created_by=user, single_submission=True)
+        FormSubmission.objects.create(form=form, submitted_by=user, unique_per_user=True)
+        with self.assertRaises(IntegrityError):
+            FormSubmission.objects.create(form=form, submitted_by=user, unique_per_user=True)
+
+    def test_multi_submission_forms_are_unconstrained(self):
+        user = User.objects.create(username='student')
+        form = Form.objects.create(title='Survey', created_by=user)
+        FormSubmission.objects.create(form=form, submitted_by=user)
+        FormSubmission.objects.create(form=form, submitted_by=user)
+        self.assertEqual(form.submissions.count(), 2)
+
+
+class UploadStorageTests(TestCase):
+    """Content-addressed upload storage, on a throwaway local filesystem storage."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        storage_settings = override_settings(STORAGES={
+            **settings.STORAGES,
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                        'OPTIONS': {'location': self.media.name}},
+        })
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+    def test_identical_uploads_share_one_file(self):
+        first = store_upload(SimpleUploadedFile('bac.PDF', b'certificate'))
+        second = store_upload(SimpleUploadedFile('copy.pdf', b'certificate'))
+        self.assertEqual(first, second)
+        stored_name, sha256, size = first
+        self.assertEqual(stored_name, f'{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf')
+        self.assertEqual(size, len(b'certificate'))
+        self.assertEqual(upload_storage().open(upload_path(stored_name)).read(), b'certificate')
+
+    def test_different_content_is_stored_separately(self):
+        first, _, _ = store_upload(SimpleUploadedFile('a.txt', b'one'))
+        second, _, _ = store_upload(SimpleUploadedFile('a.txt', b'two'))
+        self.assertNotEqual(first, second)
+
+    def test_reused_old_file_survives_gc(self):
+        reused, _, _ = store_upload(SimpleUploadedFile('bac.pdf', b'certificate'))
+        orphan, _, _ = store_upload(SimpleUploadedFile('old.pdf', b'forgotten'))
+        hour_ago = time.time() - 3600
+        for stored_name in (reused, orphan):
+            os.utime(upload_storage().path(upload_path(stored_name)), (hour_ago, hour_ago))
+
+        # An in-flight submission reuses the file, its transaction not yet committed
+        store_upload(SimpleUploadedFile('copy.pdf', b'certificate'))
+        call_command('gc_uploads', min_age=10, stdout=io.StringIO())
+
+        self.assertTrue(upload_storage().exists(upload_path(reused)))
+        self.assertFalse(upload_storage().exists(upload_path(orphan)))
+
+
+class FieldConditionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='student')
+        cls.form = Form.objects.create(title='Bourse', created_by=cls.user, status=FormStatus.PUBLISHED)
+        cls.status = FormField.objects.create(form=cls.form, name='status', label='Status', field_type=FieldType.TEXT)
+        cls.employer = FormField.objects.create(
+            form=cls.form, name='employer', label='Employer', field_type=FieldType.TEXT,
+            is_required=True, visible_condition={'status': 'employed'},
+        )
+
+    def setUp(self):
+        # Primary keys are reused across tests; drop schemas compiled for other forms
+        cache.clear()
+        _compiled.clear()
+
+    def submit(self, **values):
+        data = {f'field_{getattr(self, name).pk}': value for name, value in values.items()}
+        return self.client.post(f'/f/{self.form.slug}/', data, HTTP_HOST='localhost')
+
+    def test_hidden_fields_are_not_stored(self):
+        self.submit(status='student', employer='ACME')
+        submission = self.form.submissions.get()
+        self.assertEqual(list(submission.answers.values_list('field_id', flat=True)), [self.status.pk])
+
+    def test_required_only_when_visible(self):
+        response = self.submit(status='employed')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['errors'], {self.employer.pk: 'This field is required.'})
+        self.assertFalse(self.form.submissions.exists())
+
+        self.assertEqual(self.submit(status='student').status_code, 302)
+
+    def test_required_when_shown_by_a_radio(self):
+        self.working = FormField.objects.create(
+            form=self.form, name='working', label='Working', field_type=FieldType.RADIO,
+            options_json=[{'value': 'non', 'text': 'Non'}, {'value': 'oui', 'text': 'Oui'}],
+        )
+        self.employer.visible_condition = {'working': 'oui'}
+        self.employer.save()
+        response = self.submit(working='oui')
+        self.assertEqual(response.context['errors'], {self.employer.pk: 'This field is required.'})
+        self.assertEqual(self.submit(working='non').status_code, 302)
+        self.assertEqual(self.submit(working='oui', employer='ACME').status_code, 302)
+
+    def test_bulk_evaluation(self):
+        conditions = get_schema(self.form).conditions
+        rows = [{self.status.pk: 'employed'}, {self.status.pk: 'student'}, {}]
+        self.assertEqual(
+            list(conditions.inactive_many(rows)),
+            [frozenset(), frozenset({self.employer.pk}), frozenset({self.employer.pk})],
+        )
+
+
+class FieldValidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='student')
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user, status=FormStatus.PUBLISHED)
+        cls.matricule = FormField.objects.create(
+            form=cls.form, name='matricule', label='Matricule', field_type=FieldType.TEXT,
+            validation_json={'pattern': '[0-9]{8}'},
+        )
+        cls.age = FormField.objects.create(
+            form=cls.form, name='age', label='Age', field_type=FieldType.NUMBER, validation_json={'min': 16, 'max': 99},
+        )
+        cls.level = FormField.objects.create(
+            form=cls.form, name='level', label='Level', field_type=FieldType.SELECT,
+            options_json=[{'value': 'L1', 'text': 'L1'}, {'value': 'M1', 'text': 'M1'}],
+        )
+
+    def setUp(self):
+        # Primary keys are reused across tests; drop schemas compiled for other forms
+        cache.clear()
+        _compiled.clear()
+
+    def submit(self, **values):
+        data = {f'field_{getattr(self, name).pk}': value for name, value in values.items()}
+        return self.client.post(f'/f/{self.form.slug}/', data, HTTP_HOST='localhost')
+
+    def test_valid_submission(self):
+        self.assertEqual(self.submit(matricule='20240001', age='19', level='L1').status_code, 302)
+
+    def test_invalid_answers_are_not_written(self):
+        response = self.submit(matricule='x' * 20000, age='12', level='D1')
+        self.assertEqual(set(response.context['errors']), {self.matricule.pk, self.age.pk, self.level.pk})
+        self.assertFalse(FormAnswer.objects.exists())
+
+    def test_malformed_rules_are_rejected(self):
+        admin = User.objects.create(username='admin', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.post(
+            f'/fields/{self.matricule.pk}/update/', {'validation_json': {'pattern': '('}},
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class BuilderBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', is_staff=True)
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user)
+        cls.fields = FormField.objects.bulk_create([
+            FormField(form=cls.form, name=f'field_{i}', label=f'Field {i}', order=i) for i in range(3)
+        ])
+
+    def batch(self, operations):
+        self.client.force_login(self.user)
+        return self.client.post(
+            f'/forms/{self.form.pk}/fields/batch/', {'operations': operations},
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+
+    def test_operations_are_applied_together(self):
+        first, second, third = self.fields
+        response = self.batch([
+            {'op': 'add', 'data': {'label': 'Email', 'name': 'Email', 'field_type': FieldType.EMAIL}},
+            {'op': 'update', 'id': first.pk, 'data': {'label': 'Nom', 'is_required': True}},
+            {'op': 'delete', 'id': second.pk},
+            {'op': 'reorder', 'field_ids': [third.pk, first.pk]},
+        ])
+        data = response.json()
+        self.form.refresh_from_db()
+        self.assertEqual(data['schema_version'], self.form.schema_version)
+        self.assertEqual(
+            list(self.form.fields.order_by('order').values_list('name', 'label', 'is_required')),
+            [('field_2', 'Field 2', False), ('field_0', 'Nom', True), ('email', 'Email', False)],
+        )
+        self.assertEqual(data['created'], list(self.form.fields.filter(name='email').values_list('pk', flat=True)))
+
+    def test_reorder_accepts_string_ids(self):
+        first, second, third = self.fields
+        self.client.force_login(self.user)
+        response = self.client.post(
+            f'/forms/{self.form.pk}/reorder-fields/', {'field_ids': [str(third.pk), str(first.pk), str(second.pk)]},
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.form.fields.order_by('order').values_list('pk', flat=True)),
+                         [third.pk, first.pk, second.pk])
+        response = self.client.post(
+            f'/forms/{self.form.pk}/reorder-fields/', {'field_ids': ['x']},
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_parent_deleted_in_the_same_batch_is_rejected(self):
+        first, second, _ = self.fields
+        response = self.batch([
+            {'op': 'delete', 'id': first.pk},
+            {'op': 'update', 'id': second.pk, 'data': {'parent_field_id': first.pk}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.form.fields.count(), 3)
+
+    def test_children_of_deleted_fields_are_detached(self):
+        first, second, third = self.fields
+        FormField.objects.filter(pk=second.pk).update(parent_field=first)
+        response = self.batch([
+            {'op': 'delete', 'id': first.pk},
+            {'op': 'update', 'id': third.pk, 'data': {'parent_field_id': str(second.pk)}},
+            {'op': 'reorder', 'field_ids': [third.pk, second.pk]},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(self.form.fields.values_list('pk', 'parent_field')), {second.pk: None, third.pk: second.pk})
+
+    def test_invalid_operation_writes_nothing(self):
+        response = self.batch([
+            {'op': 'delete', 'id': self.fields[0].pk},
+            {'op': 'update', 'id': 0, 'data': {'label': 'Missing'}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.form.fields.count(), 3)
+
+    def test_malformed_batches_are_rejected(self):
+        self.client.force_login(self.user)
+        for body in ('not json', '[]', '{"operations": {}}'):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    f'/forms/{self.form.pk}/fields/batch/', body,
+                    content_type='application/json', HTTP_HOST='localhost',
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+@override_settings(FORMS_BUILDER_INSTRUMENTATION=True)
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', is_staff=True)
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.admin)
+
+    def setUp(self):
+        instrumentation.aggregates.clear()
+        self.client.force_login(self.admin)
+
+    def test_queries_are_reported(self):
+        response = self.client.get(f'/forms/{self.form.pk}/submissions/', HTTP_HOST='localhost')
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[0-9.]+;desc="[1-9][0-9]* queries"')
+
+        metrics = self.client.get('/metrics/', HTTP_HOST='localhost').content.decode()
+        self.assertIn('forms_builder_requests_total{view="submission_list"} 1', metrics)
+        self.assertRegex(metrics, r'forms_builder_sql_queries_total\{view="submission_list"\} [1-9]')
+
+    def test_metrics_are_staff_only(self):
+        self.client.force_login(User.objects.create(username='student'))
+        self.assertEqual(self.client.get('/metrics/', HTTP_HOST='localhost').status_code, 403)
+
+    @override_settings(FORMS_BUILDER_INSTRUMENTATION=False)
+    def test_disabled(self):
+        response = self.client.get(f'/forms/{self.form.pk}/submissions/', HTTP_HOST='localhost')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get('/metrics/', HTTP_HOST='localhost').status_code, 404)
+
+
+class SubmissionThrottlingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin')
+        cls.form = Form.objects.create(
+            title='Bourse', created_by=cls.user, status=FormStatus.PUBLISHED, submission_rate=1, submission_burst=2,
+        )
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def submit(self):
+        return self.client.post(f'/f/{self.form.slug}/', {}, HTTP_HOST='localhost')
+
+    def test_burst_then_rate_limited(self):
+        self.assertEqual([self.submit().status_code for _ in range(3)], [302, 302, 429])
+        self.assertEqual(self.form.submissions.count(), 2)
+        self.assertGreater(int(self.submit()['Retry-After']), 50)
+
+    def test_clients_have_separate_buckets(self):
+        self.submit(), self.submit()
+        response = self.client.post(f'/f/{self.form.slug}/', {}, HTTP_HOST='localhost', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(FORMS_BUILDER_MAX_ACTIVE_SUBMISSIONS=1, FORMS_BUILDER_SUBMISSION_QUEUE=0)
+    def test_admission_limit(self):
+        self.assertTrue(throttling.admission.enter())
+        try:
+            response = self.submit()
+        finally:
+            throttling.admission.leave()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(self.submit().status_code, 302)
+
+    @override_settings(
+        FORMS_BUILDER_MAX_ACTIVE_SUBMISSIONS=1, FORMS_BUILDER_SUBMISSION_QUEUE=1,
+        FORMS_BUILDER_SUBMISSION_QUEUE_TIMEOUT=0.05,
+    )
+    def test_admission_queue(self):
+        gate = throttling.AdmissionGate()
+        self.assertTrue(gate.enter())
+        queued = []
+        waiter = threading.Thread(target=lambda: queued.append(gate.enter()))
+        waiter.start()
+        while not gate.waiters:
+            time.sleep(0.001)
+        self.assertFalse(gate.enter())  # the queue is full
+        gate.leave()
+        waiter.join()
+        self.assertEqual(queued, [True])
+        self.assertFalse(gate.enter())  # the slot is still taken, the wait times out
+
+class SubmissionTokenTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin')
+        cls.form = Form.objects.create(title='Bourse', created_by=cls.user, status=FormStatus.PUBLISHED)
+        cls.name = FormField.objects.create(form=cls.form, name='name', label='Name', field_type=FieldType.TEXT)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def render_token(self):
+        response = self.client.get(f'/f/{self.form.slug}/', HTTP_HOST='localhost')
+        return str(response.context['submission_token'])
+
+    def test_each_render_gets_a_token(self):
+        first, second = self.render_token(), self.render_token()
+        self.assertNotEqual(first, second)
+        response = self.client.get(f'/f/{self.form.slug}/', HTTP_HOST='localhost')
+        self.assertContains(response, f'name="submission_token" value="{response.context["submission_token"]}"')
+
+    def test_replayed_post_is_not_written_again(self):
+        data = {f'field_{self.name.pk}': 'Amina', 'submission_token': self.render_token()}
+        responses = [self.client.post(f'/f/{self.form.slug}/', data, HTTP_HOST='localhost') for _ in range(2)]
+        self.assertEqual([response.url for response in responses], [f'/f/{self.form.slug}/success/'] * 2)
+        self.assertEqual(self.form.submissions.count(), 1)
+
+
+class ExportJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', is_staff=True)
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user)
+        FormField.objects.create(form=cls.form, name='name', label='Name', field_type=FieldType.TEXT)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+        self.private = tempfile.TemporaryDirectory()
+        self.addCleanup(self.private.cleanup)
+        # The field resolves its storage once, at import
+        storage = mock.patch.object(
+            ExportJob._meta.get_field('file'), 'storage', FileSystemStorage(location=self.private.name)
+        )
+        storage.start()
+        self.addCleanup(storage.stop)
+
+    def export(self):
+        return run_job(request_export(self.form, ExportFormat.CSV, {}, self.user, 'http://localhost/'))
+
+    def test_errors_before_writing_fail_the_job(self):
+        job = request_export(self.form, ExportFormat.CSV, {}, self.user, 'http://localhost/')
+        with mock.patch('forms_builder.jobs.get_schema', side_effect=RuntimeError('broken schema')), \
+                self.assertLogs('forms_builder.jobs', 'ERROR'):
+            run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ExportStatus.FAILED, 'broken schema'))
+
+    def test_artifacts_are_private_and_superseded_ones_evicted(self):
+        first = self.export()
+        self.assertTrue(first.file.path.startswith(self.private.name))
+        FormSubmission.objects.create(form=self.form)
+        second = self.export()
+        self.assertFalse(ExportJob.objects.filter(pk=first.pk).exists())
+        self.assertFalse(os.path.exists(first.file.path))
+        self.assertTrue(os.path.exists(second.file.path))
+
+    def test_expired_jobs_are_evicted(self):
+        job = self.export()
+        ExportJob.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(evict_expired(), 1)
+        self.assertFalse(os.path.exists(job.file.path))
+
+
+    def test_worker_reconnects_after_a_failed_claim(self):
+        worker = 'forms_builder.management.commands.run_export_worker'
+        calls = mock.Mock()
+        calls.claim_next_job.side_effect = [DatabaseError('server closed the connection unexpectedly'), None]
+        with mock.patch(f'{worker}.claim_next_job', calls.claim_next_job), \
+                mock.patch(f'{worker}.close_old_connections', calls.close_old_connections), \
+                mock.patch(f'{worker}.connections'):
+            run_export_worker.Command(stderr=io.StringIO()).work({'once': True, 'poll_interval': 0})
+        # The broken connection is dropped before the next claim
+        self.assertEqual([name for name, *_ in calls.mock_calls], [
+            'close_old_connections', 'claim_next_job', 'close_old_connections',
+            'close_old_connections', 'claim_next_job',
+        ])
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', is_staff=True)
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user)
+        FormSubmission.objects.bulk_create([FormSubmission(form=cls.form) for _ in range(7)])
+        # Submissions of a rush share their timestamp; the id breaks the tie
+        cls.form.submissions.update(submitted_at=timezone.now())
+        cls.keys = ['submitted_at', 'id']
+
+    def test_pages_are_continuous_across_equal_timestamps(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(self.form.submissions.all(), self.keys, cursor, 3)
+            seen += [submission.pk for submission in page]
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(self.form.submissions.values_list('pk', flat=True), reverse=True))
+
+    def test_invalid_cursors_restart_at_the_first_page(self):
+        first_page, _ = keyset_page(self.form.submissions.all(), self.keys, None, 3)
+        for cursor in ('%%%', 'bm90IGpzb24', encode_cursor([1, 2]), encode_cursor(['x', 'abc']),
+                       encode_cursor(['2026-01-01T00:00:00', True]), encode_cursor({'id': 1})):
+            page, _ = keyset_page(self.form.submissions.all(), self.keys, cursor, 3)
+            self.assertEqual(page, first_page, cursor)
+
+        self.client.force_login(self.user)
+        response = self.client.get(
+            f'/forms/{self.form.pk}/submissions/data/', {'cursor': encode_cursor([1, 2])}, HTTP_HOST='localhost'
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class SubmissionUpdateTests(TestCase):
+    """Updates only write the answers and file rows that changed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='student')
+        cls.form = Form.objects.create(
+            title='Inscription', created_by=cls.user, status=FormStatus.PUBLISHED,
+            single_submission=True, allow_update=True,
+        )
+        cls.name = FormField.objects.create(form=cls.form, name='name', label='Name', field_type=FieldType.TEXT)
+        cls.city = FormField.objects.create(form=cls.form, name='city', label='City', field_type=FieldType.TEXT)
+        cls.bac = FormField.objects.create(form=cls.form, name='bac', label='Bac', field_type=FieldType.FILE)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        storage_settings = override_settings(STORAGES={
+            **settings.STORAGES,
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                        'OPTIONS': {'location': self.media.name}},
+        })
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+        self.client.force_login(self.user)
+
+    def submit(self, **data):
+        response = self.client.post(f'/f/{self.form.slug}/', data, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 302)
+        return self.form.submissions.get()
+
+    def answers(self, submission):
+        return {answer.field_id: (answer.pk, answer.value_text) for answer in submission.answers.all()}
+
+    def test_only_changed_answers_are_written(self):
+        submission = self.submit(**{
+            f'field_{self.name.pk}': 'Amina', f'field_{self.city.pk}': 'Setif',
+            f'field_{self.bac.pk}': SimpleUploadedFile('bac.pdf', b'first'),
+        })
+        before = self.answers(submission)
+        first_file = submission.files.get()
+
+        submission = self.submit(**{
+            f'field_{self.name.pk}': 'Amina', f'field_{self.city.pk}': 'Alger',
+            f'field_{self.bac.pk}': SimpleUploadedFile('bac.pdf', b'second'),
+        })
+        after = self.answers(submission)
+        self.assertEqual(after[self.name.pk], before[self.name.pk])
+        self.assertEqual(after[self.city.pk], (before[self.city.pk][0], 'Alger'))
+        second_file = submission.files.get()
+        self.assertNotEqual(second_file.pk, first_file.pk)
+        self.assertEqual(after[self.bac.pk], (before[self.bac.pk][0], second_file.stored_filename))
+
+        # Keeping the stored file leaves its row alone
+        self.submit(**{
+            f'field_{self.name.pk}': 'Amina', f'field_{self.city.pk}': 'Alger',
+            f'existing_file_{self.bac.pk}': second_file.stored_filename,
+        })
+        self.assertEqual(list(submission.files.values_list('pk', flat=True)), [second_file.pk])
+
+    def test_removed_answers_are_deleted(self):
+        submission = self.submit(**{
+            f'field_{self.name.pk}': 'Amina', f'field_{self.bac.pk}': SimpleUploadedFile('bac.pdf', b'first'),
+        })
+        self.submit(**{f'field_{self.name.pk}': 'Amina'})
+        self.assertNotIn(self.bac.pk, self.answers(submission))
+        self.assertFalse(submission.files.exists())
+
+
+class SubmissionCounterTests(TestCase):
+    """The denormalised counters on Form follow creations, changes and deletions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        cls.form = Form.objects.create(title='Bourse', created_by=cls.admin, status=FormStatus.PUBLISHED)
+        cls.other = Form.objects.create(title='Survey', created_by=cls.admin, status=FormStatus.PUBLISHED)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+        self.model_admin = FormSubmissionAdmin(FormSubmission, admin.site)
+        self.request = RequestFactory().post('/')
+        self.request.user = self.admin
+
+    def counters(self, form):
+        form.refresh_from_db()
+        return form.submission_count, form.pending_count, form.approved_count, form.rejected_count
+
+    def test_counters_follow_submissions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                self.client.post(f'/f/{self.form.slug}/', {}, HTTP_HOST='localhost')
+        self.assertEqual(self.counters(self.form), (3, 3, 0, 0))
+        first, second, third = self.form.submissions.order_by('pk')
+        self.assertEqual(self.form.last_submission_at, third.submitted_at)
+
+        first.status = SubmissionStatus.APPROVED
+        self.model_admin.save_model(self.request, first, None, True)
+        second.form = self.other
+        self.model_admin.save_model(self.request, second, None, True)
+        self.assertEqual(self.counters(self.form), (2, 1, 1, 0))
+        self.assertEqual(self.counters(self.other), (1, 1, 0, 0))
+
+        self.model_admin.delete_queryset(self.request, FormSubmission.objects.filter(pk__in=[first.pk, third.pk]))
+        self.assertEqual(self.counters(self.form), (0, 0, 0, 0))
+        self.assertIsNone(self.form.last_submission_at)
+
+    def test_submissions_are_counted_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(f'/f/{self.form.slug}/', {}, HTTP_HOST='localhost')
+            # The form row is left alone while the submission is written
+            self.assertEqual(self.counters(self.form), (0, 0, 0, 0))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.counters(self.form), (1, 1, 0, 0))
+
+    def test_reconcile_repairs_drift(self):
+        FormSubmission.objects.bulk_create([
+            FormSubmission(form=self.form, status=SubmissionStatus.REJECTED),
+            FormSubmission(form=self.form),
+        ])
+        output = io.StringIO()
+        call_command('reconcile_form_counters', stdout=output)
+        self.assertEqual(self.counters(self.form), (2, 1, 0, 1))
+        self.assertEqual(self.counters(self.other), (0, 0, 0, 0))
+        self.assertIn('1 had drifted', output.getvalue())
+
+
+class AcademicColumnTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin')
+        cls.faculte = Faculte.objects.create(nom='Sciences')
+        cls.domaine = Domaine.objects.create(nom='Informatique', faculte=cls.faculte)
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user)
+        cls.faculte_field = FormField.objects.create(
+            form=cls.form, name='faculte', label='Faculte', field_type=FieldType.SELECT_FACULTE,
+        )
+        cls.domaine_field = FormField.objects.create(
+            form=cls.form, name='domaine', label='Domaine', field_type=FieldType.SELECT_DOMAINE,
+        )
+
+    def setUp(self):
+        cache.clear()
+        hierarchy.invalidate_tree()
+
+    def test_tree_is_read_once_per_call(self):
+        with mock.patch('academic.hierarchy.get_tree', wraps=hierarchy.get_tree) as get_tree:
+            columns = academic_columns([
+                (FieldType.SELECT_FACULTE, str(self.faculte.pk)), (FieldType.SELECT_DOMAINE, '999999'),
+            ])
+        self.assertEqual(get_tree.call_count, 1)
+        self.assertEqual(columns['faculte_id'], self.faculte.pk)
+        self.assertIsNone(columns['domaine_id'])
+
+    def test_backfill(self):
+        submissions = [FormSubmission.objects.create(form=self.form) for _ in range(3)]
+        FormAnswer.objects.bulk_create([
+            answer for submission in submissions for answer in (
+                FormAnswer(submission=submission, field=self.faculte_field, value_text=str(self.faculte.pk)),
+                FormAnswer(submission=submission, field=self.domaine_field, value_text=str(self.domaine.pk)),
+            )
+        ])
+        call_command('backfill_academic_columns', batch_size=2, stdout=io.StringIO())
+        self.assertEqual(
+            set(FormSubmission.objects.values_list('faculte_id', 'domaine_id')), {(self.faculte.pk, self.domaine.pk)}
+        )
+
+
+class ReadOnlyViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin')
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user, status=FormStatus.PUBLISHED)
+        Faculte.objects.create(nom='Sciences')
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+        hierarchy.invalidate_tree()
+
+    def test_unknown_objects_are_not_found(self):
+        for url in ('/f/missing/', '/f/missing/success/', '/api/fields/999999/options/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_HOST='localhost').status_code, 404)
+
+    def test_form_pages(self):
+        self.assertEqual(self.client.get(f'/f/{self.form.slug}/', HTTP_HOST='localhost').status_code, 200)
+        self.assertEqual(self.client.get(f'/f/{self.form.slug}/success/', HTTP_HOST='localhost').status_code, 200)
+
+    def test_unchanged_api_responses_are_not_resent(self):
+        response = self.client.get('/api/facultes/', HTTP_HOST='localhost')
+        self.assertEqual(response.json()[0]['nom'], 'Sciences')
+        response = self.client.get('/api/facultes/', HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RoleCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='staff')
+        cls.group = Group.objects.create(name='facadmin')
+
+    def setUp(self):
+        cache.clear()
+        roles._local_versions.clear()
+        self.session = SessionStore()
+
+    def resolve(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        request.session = self.session
+        return set(roles.get_roles(request)), request
+
+    def test_roles_are_resolved_once(self):
+        with self.assertNumQueries(1):
+            resolved, request = self.resolve()
+            self.assertEqual(resolved, set())
+            roles.can_edit_admin_fields(request)
+            roles.is_form_admin(request)
+        # The next request reads the session copy; the versions are known locally
+        with mock.patch.object(roles, 'cache') as shared_cache, self.assertNumQueries(0):
+            self.assertEqual(self.resolve()[0], set())
+        shared_cache.get_many.assert_not_called()
+
+    def test_group_changes_invalidate_roles(self):
+        self.resolve()
+        self.user.groups.add(self.group)
+        self.assertEqual(self.resolve()[0], {'facadmin'})
+        self.group.name = 'admin'
+        self.group.save()
+        self.assertEqual(self.resolve()[0], {'admin'})
+        self.group.user_set.clear()
+        self.assertEqual(self.resolve()[0], set())
+
+    @override_settings(FORMS_BUILDER_ROLE_VERSION_TTL=0)
+    def test_other_processes_see_changes_through_the_cache(self):
+        self.resolve()
+        self.user.groups.add(self.group)
+        roles._local_versions.clear()
+        self.assertEqual(self.resolve()[0], {'facadmin'})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SchemaCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', is_staff=True)
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user)
+        cls.field = FormField.objects.create(form=cls.form, name='name', label='Name', field_type=FieldType.TEXT)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def test_schema_is_compiled_once_per_version(self):
+        with self.assertNumQueries(1):
+            schema = get_schema(self.form)
+        with self.assertNumQueries(0):
+            self.assertIs(get_schema(self.form), schema)
+        # Other processes get the fields from the shared cache
+        _compiled.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_schema(self.form).fields, schema.fields)
+
+    def test_builder_edits_recompile_the_schema(self):
+        version = get_schema(self.form).version
+        self.client.force_login(self.user)
+        response = self.client.post(
+            f'/fields/{self.field.pk}/update/', {'label': 'Full name'},
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.form.refresh_from_db()
+        schema = get_schema(self.form)
+        self.assertEqual(schema.version, version + 1)
+        self.assertEqual(schema.by_id[self.field.pk].label, 'Full name')
+
+
+class ExcelExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin')
+        cls.form = Form.objects.create(title='Bourse', created_by=cls.user)
+        cls.status = FormField.objects.create(form=cls.form, name='status', label='Status', field_type=FieldType.TEXT)
+        cls.employer = FormField.objects.create(
+            form=cls.form, name='employer', label='Employer', field_type=FieldType.TEXT,
+            visible_condition={'status': 'employed'},
+        )
+        cls.age = FormField.objects.create(form=cls.form, name='age', label='Age', field_type=FieldType.NUMBER)
+        cls.born = FormField.objects.create(form=cls.form, name='born', label='Born', field_type=FieldType.DATE)
+        cls.submissions = []
+        for status, age in (('employed', '31'), ('student', '19')):
+            submission = FormSubmission.objects.create(form=cls.form)
+            FormAnswer.objects.bulk_create([
+                FormAnswer(submission=submission, field=cls.status, value_text=status),
+                # Stored before the condition hid the field for students
+                FormAnswer(submission=submission, field=cls.employer, value_text='ACME'),
+                FormAnswer(submission=submission, field=cls.age, value_text=age),
+                FormAnswer(submission=submission, field=cls.born, value_text='2001-09-14'),
+            ])
+            cls.submissions.append(submission)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def test_workbook(self):
+        schema = get_schema(self.form)
+        rows = iter_export_rows(
+            self.form.submissions.all(), schema.fields, lambda name: name,
+            use_documents=False, conditions=schema.conditions,
+        )
+        output = io.BytesIO()
+        write_excel(output, 'Bourse Submissions', schema.fields, rows)
+        output.seek(0)
+        sheet = load_workbook(output)['Bourse Submissions']
+        values = [[cell.value for cell in row] for row in sheet.iter_rows()]
+        self.assertEqual(values[0], ['Submission ID', 'Submitted At', 'Status', 'Status', 'Employer', 'Age', 'Born'])
+        employed, student = self.submissions
+        self.assertEqual(values[1][0], student.pk)
+        self.assertEqual(values[1][3:], ['student', None, 19, datetime(2001, 9, 14)])
+        self.assertEqual(values[2][0], employed.pk)
+        self.assertEqual(values[2][3:], ['employed', 'ACME', 31, datetime(2001, 9, 14)])
+        self.assertIsInstance(values[2][1], datetime)
+
+
+class CsvExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', is_staff=True)
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user)
+        cls.name = FormField.objects.create(form=cls.form, name='name', label='Name', field_type=FieldType.TEXT)
+        # More than two chunks, the last one partial
+        submissions = FormSubmission.objects.bulk_create([FormSubmission(form=cls.form) for _ in range(1101)])
+        FormAnswer.objects.bulk_create([
+            FormAnswer(submission=submission, field=cls.name, value_text=f'Student {submission.pk}')
+            for submission in submissions
+        ])
+        cls.ids = sorted((submission.pk for submission in submissions), reverse=True)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def test_chunks_neither_skip_nor_repeat_rows(self):
+        rows = list(iter_export_rows(
+            self.form.submissions.all(), [self.name], lambda name: name, use_documents=False,
+        ))
+        self.assertEqual([row[0] for row in rows], self.ids)
+        self.assertTrue(all(row[3] == f'Student {row[0]}' for row in rows))
+
+    def test_export_is_streamed(self):
+        self.client.force_login(self.user)
+        response = self.client.get(f'/forms/{self.form.pk}/export/', HTTP_HOST='localhost')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        lines = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(lines[0], ['Submission ID', 'Submitted At', 'Status', 'Name'])
+        self.assertEqual([int(line[0]) for line in lines[1:]], self.ids)
+
+
+class AnswerDocumentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', is_staff=True)
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user, status=FormStatus.PUBLISHED)
+        cls.name = FormField.objects.create(form=cls.form, name='name', label='Name', field_type=FieldType.TEXT)
+        cls.decision = FormField.objects.create(
+            form=cls.form, name='decision', label='Decision', field_type=FieldType.TEXT, admin_only=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def answers_document(self, submission):
+        return build_document(submission.answers.values_list('field_id', 'value_text'))
+
+    def test_document_follows_the_answers(self):
+        self.client.post(
+            f'/f/{self.form.slug}/', {f'field_{self.name.pk}': 'Amina'}, HTTP_HOST='localhost',
+        )
+        submission = self.form.submissions.get()
+        self.assertEqual(submission.answer_document, self.answers_document(submission))
+
+        answer = submission.answers.get(field=self.decision)
+        self.client.force_login(self.user)
+        self.client.post(
+            f'/submissions/{submission.pk}/update-answer/{answer.pk}/', {'value': 'accepted'}, HTTP_HOST='localhost',
+        )
+        submission.refresh_from_db()
+        self.assertEqual(submission.answer_document[str(self.decision.pk)], 'accepted')
+        self.assertEqual(submission.answer_document, self.answers_document(submission))
+
+    def test_backfill(self):
+        missing, stale = FormSubmission.objects.bulk_create([
+            FormSubmission(form=self.form), FormSubmission(form=self.form, answer_document={}),
+        ])
+        FormAnswer.objects.bulk_create([
+            FormAnswer(submission=submission, field=self.name, value_text='Amina') for submission in (missing, stale)
+        ])
+        call_command('backfill_answer_documents', stdout=io.StringIO())
+        missing.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertEqual(missing.answer_document, {str(self.name.pk): 'Amina'})
+        self.assertEqual(stale.answer_document, {})
+
+        call_command('backfill_answer_documents', rebuild=True, stdout=io.StringIO())
+        stale.refresh_from_db()
+        self.assertEqual(stale.answer_document, {str(self.name.pk): 'Amina'})
+
+
+class SearchIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin')
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user, status=FormStatus.PUBLISHED)
+        cls.name = FormField.objects.create(form=cls.form, name='name', label='Name', field_type=FieldType.TEXT)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def search(self, text):
+        return list(search_submissions(self.form.submissions.all(), text).values_list('pk', flat=True))
+
+    @skipUnless(connection.vendor == 'postgresql', 'The search index is PostgreSQL only')
+    def test_submissions_are_found_through_their_vector(self):
+        self.client.post(f'/f/{self.form.slug}/', {f'field_{self.name.pk}': 'Amina Belkacem'}, HTTP_HOST='localhost')
+        submission = self.form.submissions.get()
+        self.assertIsNotNone(submission.search_vector)
+        self.assertEqual(self.search('belk'), [submission.pk])
+        self.assertEqual(self.search('Yacine'), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'The search index is PostgreSQL only')
+    def test_unindexed_submissions_fall_back_to_substrings(self):
+        submission = FormSubmission.objects.create(form=self.form)
+        FormAnswer.objects.create(submission=submission, field=self.name, value_text='Amina Belkacem')
+        self.assertEqual(self.search('elkac'), [submission.pk])
+
+        call_command('rebuild_search_index', missing=True, stdout=io.StringIO())
+        submission.refresh_from_db()
+        self.assertIsNotNone(submission.search_vector)
+        self.assertEqual(self.search('Belkacem'), [submission.pk])
+
+    @skipIf(connection.vendor == 'postgresql', 'The search index exists on PostgreSQL')
+    def test_rebuild_requires_postgresql(self):
+        with self.assertRaisesMessage(CommandError, 'The search index requires PostgreSQL.'):
+            call_command('rebuild_search_index', stdout=io.StringIO())
+
+
+class ChildOptionsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin')
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user, status=FormStatus.PUBLISHED)
+        cls.wilaya = FormField.objects.create(
+            form=cls.form, name='wilaya', label='Wilaya', field_type=FieldType.SELECT,
+            options_json=[{'value': '19', 'text': 'Sétif'}, {'value': '16', 'text': 'Alger'}],
+        )
+        cls.commune = FormField.objects.create(
+            form=cls.form, name='commune', label='Commune', field_type=FieldType.SELECT, parent_field=cls.wilaya,
+            options_json=[
+                {'value': 'eulma', 'text': 'El Eulma', 'parentValue': '19'},
+                {'value': 'setif', 'text': 'Sétif', 'parentValue': '19'},
+                {'value': 'bab-ezzouar', 'text': 'Bab Ezzouar', 'parentValue': '16'},
+            ],
+        )
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def get(self, path, **params):
+        return self.client.get(f'/api/fields/{self.commune.pk}/{path}', params, HTTP_HOST='localhost')
+
+    def test_options_of_a_parent_value(self):
+        self.assertEqual(get_schema(self.form).options_for(self.commune.pk, '16'), (
+            {'value': 'bab-ezzouar', 'text': 'Bab Ezzouar', 'parentValue': '16'},
+        ))
+        response = self.get('options/', parent_value='19')
+        self.assertEqual([option['value'] for option in response.json()], ['eulma', 'setif'])
+        self.assertEqual(self.get('options/', parent_value='31').json(), [])
+
+    def test_bulk_options(self):
+        response = self.get('options/bulk/')
+        self.assertEqual(
+            {value: [option['value'] for option in options] for value, options in response.json().items()},
+            {'19': ['eulma', 'setif'], '16': ['bab-ezzouar']},
+        )
+        response = self.get('options/bulk/', parent_value=['16', '31'])
+        self.assertEqual(response.json(), {
+            '16': [{'value': 'bab-ezzouar', 'text': 'Bab Ezzouar', 'parentValue': '16'}], '31': [],
+        })
+
+        etag = response['ETag']
+        response = self.client.get(
+            f'/api/fields/{self.commune.pk}/options/bulk/', {'parent_value': ['31', '16']},
+            HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 304)
+        # Editing the field changes the version and so the ETag
+        bump_schema_version(self.form)
+        response = self.client.get(
+            f'/api/fields/{self.commune.pk}/options/bulk/', {'parent_value': ['16', '31']},
+            HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(FORMS_BUILDER_FORM_CACHE_TIMEOUT=3600)
+class FormFragmentCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin')
+        cls.form = Form.objects.create(title='Inscription', created_by=cls.user, status=FormStatus.PUBLISHED)
+        FormField.objects.create(form=cls.form, name='name', label='Full name', field_type=FieldType.TEXT)
+
+    def setUp(self):
+        cache.clear()
+        _compiled.clear()
+
+    def render(self):
+        return self.client.get(f'/f/{self.form.slug}/', HTTP_HOST='localhost')
+
+    def fragment_key(self, response):
+        self.form.refresh_from_db()
+        return make_template_fragment_key('form_fields', [
+            self.form.pk, self.form.schema_version, response.context['LANGUAGE_CODE'], False,
+        ])
+
+    def test_published_form_markup_is_reused(self):
+        response = self.render()
+        self.assertContains(response, 'Full name')
+        key = self.fragment_key(response)
+        self.assertIn('Full name', cache.get(key))
+        cache.set(key, '<p>cached fields</p>')
+        self.assertContains(self.render(), 'cached fields')
+
+        bump_schema_version(self.form)
+        response = self.render()
+        self.assertNotContains(response, 'cached fields')
+        self.assertNotEqual(self.fragment_key(response), key)
+        self.assertIsNotNone(cache.get(self.fragment_key(response)))
@@ -0,0 +1,148 @@
+"""Admission control and per-client rate limits for form submissions."""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'forms_builder:rate'
+LOCAL_BUCKETS = 10000
+
+
+class LocalBuckets:
+    """Process-local bucket states, used while the cache is unreachable."""
+
+    def __init__(self, size=LOCAL_BUCKETS):
+        self.lock = threading.Lock()
+        self.size = size
+        self.states = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            return self.states.get(key)
+
+    def set(self, key, state):
+        with self.lock:
+            self.states[key] = state
+            self.states.move_to_end(key)
+            if len(self.states) > self.size:
+                self.states.popitem(last=False)
+
+
+_local = LocalBuckets()
+
+
+def _load(key):
+    try:
+        return cache.get(key), True
+    except Exception:
+        logger.warning('Rate limit cache unavailable, using local buckets', exc_info=True)
+        return _local.get(key), False
+
+
+def _store(key, state, timeout, shared):
+    if shared:
+        try:
+            cache.set(key, state, timeout)
+            return
+        except Exception:
+            logger.warning('Rate limit cache unavailable, using local buckets', exc_info=True)
+    _local.set(key, state)
+
+
+def take(key, rate, burst):
+    """Take a token from the bucket ``key`` holding up to ``burst`` tokens refilled at ``rate`` per minute.
+
+    Returns 0 when a token was taken, otherwise the seconds until one is
+    available. The read and write are not atomic, so concurrent requests of
+    the same client may occasionally be let through together.
+    """
+    capacity = max(burst, 1)
+    per_second = rate / 60
+    now = time.time()
+    state, shared = _load(key)
+    tokens = capacity
+    if state is not None:
+        tokens, updated = state
+        tokens = min(capacity, tokens + (now - updated) * per_second)
+    if tokens < 1:
+        return (1 - tokens) / per_second
+    # Entries expire once the bucket would be full again
+    _store(key, (tokens - 1, now), math.ceil(capacity / per_second) + 1, shared)
+    return 0
+
+
+def client_key(request, user):
+    if user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def submission_wait(request, user, form):
+    """Seconds the client of ``request`` must wait before submitting ``form``, 0 when it may."""
+    if not form.submission_rate:
+        return 0
+    return take(
+        f'{KEY_PREFIX}:{form.pk}:{client_key(request, user)}', form.submission_rate, form.submission_burst
+    )
+
+
+class AdmissionGate:
+    """Bounds the submissions handled at once by this process.
+
+    Up to ``FORMS_BUILDER_MAX_ACTIVE_SUBMISSIONS`` submissions run at once (0
+    admits everything). Further ones wait, first come first served, in a queue
+    of ``FORMS_BUILDER_SUBMISSION_QUEUE`` places for at most
+    ``FORMS_BUILDER_SUBMISSION_QUEUE_TIMEOUT`` seconds; the rest are refused.
+    Sync views get a thread per request under WSGI and ASGI alike, so a
+    waiting submission only blocks its own thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiters = deque()
+
+    def enter(self):
+        """Wait for a slot; ``False`` when the queue is full or the wait timed out."""
+        limit = getattr(settings, 'FORMS_BUILDER_MAX_ACTIVE_SUBMISSIONS', 0)
+        with self.lock:
+            if not limit or self.active < limit:
+                self.active += 1
+                return True
+            if len(self.waiters) >= getattr(settings, 'FORMS_BUILDER_SUBMISSION_QUEUE', 0):
+                return False
+            waiter = threading.Event()
+            self.waiters.append(waiter)
+        if waiter.wait(getattr(settings, 'FORMS_BUILDER_SUBMISSION_QUEUE_TIMEOUT', 10)):
+            return True
+        with self.lock:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+                return False
+        # The slot was handed over just as the wait timed out
+        return True
+
+    def leave(self):
+        """Release a slot, handing it to the longest waiting submission if any."""
+        with self.lock:
+            if self.waiters:
+                self.waiters.popleft().set()
+            else:
+                self.active -= 1
+
+
+admission = AdmissionGate()
+
+
+def retry_after(seconds=None):
+    """``Retry-After`` value, in whole seconds, for a refused submission."""
+    if seconds is None:
+        seconds = getattr(settings, 'FORMS_BUILDER_SUBMISSION_RETRY_AFTER', 5)
+    return str(max(1, math.ceil(seconds)))
@@ -13,14 +13,19 @@ urlpatterns = [
     path('forms/<int:pk>/builder/', views.form_builder, name='form_builder'),
     path('forms/<int:form_pk>/add-field/', views.add_field, name='add_field'),
     path('forms/<int:form_pk>/reorder-fields/', views.reorder_fields, name='reorder_fields'),
+    path('forms/<int:form_pk>/fields/batch/', views.batch_fields, name='batch_fields'),
     path('fields/<int:field_pk>/', views.get_field, name='get_field'),
     path('fields/<int:field_pk>/update/', views.update_field, name='update_field'),
     path('fields/<int:field_pk>/delete/', views.delete_field, name='delete_field'),
     path('forms/<int:form_pk>/submissions/', views.submission_list, name='submission_list'),
+    path('forms/<int:form_pk>/submissions/data/', views.submission_list_data, name='submission_list_data'),
     path('submissions/<int:pk>/', views.submission_detail, name='submission_detail'),
     path('submissions/<int:pk>/update-answer/<int:answer_id>/', views.update_answer, name='update_answer'),
     path('forms/<int:form_pk>/export/', views.export_csv, name='export_csv'),
     path('forms/<int:form_pk>/export-excel/', views.export_excel, name='export_excel'),
+    path('exports/<int:pk>/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:pk>/download/', views.export_job_download, name='export_job_download'),
+    path('metrics/', views.metrics, name='metrics'),
     
     # Public form submission
     path('f/<slug:slug>/', views.form_submit_view, name='form_submit'),
@@ -31,5 +36,7 @@ urlpatterns = [
     path('api/facultes/', views.api_facultes, name='api_facultes'),
     path('api/domaines/', views.api_domaines, name='api_domaines'),
     path('api/specialites/', views.api_specialites, name='api_specialites'),
+    path('api/academic-tree/', views.api_academic_tree, name='api_academic_tree'),
     path('api/fields/<int:field_pk>/options/', views.api_child_options, name='api_child_options'),
+    path('api/fields/<int:field_pk>/options/bulk/', views.api_child_options_bulk, name='api_child_options_bulk'),
 ]
@@ -0,0 +1,178 @@
+"""Server-side checks of submitted answers, compiled from ``FormField.validation_json``.
+
+Supported keys:
+
+- ``min_length`` / ``max_length``: bounds on the answer length, in characters
+- ``pattern``: regular expression the whole answer must match
+- ``min`` / ``max``: numeric range of NUMBER answers
+- ``max_file_size``: largest accepted upload, in bytes
+- ``allowed_extensions``: accepted upload extensions, e.g. ``[".pdf", ".jpg"]``
+- ``allowed_content_types``: accepted upload content types
+
+Choice fields only accept the values of their ``options_json``, and every
+answer is capped at ``FORMS_BUILDER_MAX_ANSWER_LENGTH`` characters unless a
+``max_length`` is given.
+"""
+import datetime
+import os
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator, validate_email
+
+from .models import FieldType
+
+
+CHOICE_FIELD_TYPES = (FieldType.SELECT, FieldType.RADIO, FieldType.CHECKBOX)
+
+_validate_url = URLValidator()
+
+
+def _option_value(option):
+    return str(option.get('value', '')) if isinstance(option, dict) else str(option)
+
+
+def _number(text):
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return None
+    return value if value.is_finite() else None
+
+
+def _max_length(limit):
+    return lambda text: f'Ensure this value has at most {limit} characters.' if len(text) > limit else None
+
+
+def _min_length(limit):
+    return lambda text: f'Ensure this value has at least {limit} characters.' if len(text) < limit else None
+
+
+def _pattern(pattern):
+    regex = re.compile(pattern)
+    return lambda text: None if regex.fullmatch(text) else 'Enter a value in the expected format.'
+
+
+def _number_range(low, high):
+    low = None if low is None else Decimal(str(low))
+    high = None if high is None else Decimal(str(high))
+
+    def check(text):
+        value = _number(text)
+        if value is None:
+            return 'Enter a number.'
+        if low is not None and value < low:
+            return f'Ensure this value is greater than or equal to {low}.'
+        if high is not None and value > high:
+            return f'Ensure this value is less than or equal to {high}.'
+        return None
+    return check
+
+
+def _django_validator(validate, message):
+    def check(text):
+        try:
+            validate(text)
+        except ValidationError:
+            return message
+        return None
+    return check
+
+
+def _date(text):
+    try:
+        datetime.date.fromisoformat(text)
+    except ValueError:
+        return 'Enter a valid date.'
+    return None
+
+
+def rules_error(rules):
+    """Why ``rules`` is not a usable ``validation_json``, or ``None`` when it is."""
+    if not isinstance(rules, dict):
+        return 'validation_json must be an object.'
+    if rules.get('pattern'):
+        try:
+            re.compile(rules['pattern'])
+        except (re.error, TypeError):
+            return 'validation_json pattern is not a valid regular expression.'
+    for key in ('min', 'max'):
+        if rules.get(key) is not None and (isinstance(rules[key], bool) or _number(str(rules[key])) is None):
+            return f'validation_json {key} must be a number.'
+    for key in ('min_length', 'max_length', 'max_file_size'):
+        if rules.get(key) is not None and (type(rules[key]) is not int or rules[key] < 0):
+            return f'validation_json {key} must be a positive integer.'
+    for key in ('allowed_extensions', 'allowed_content_types'):
+        values = rules.get(key)
+        if values is not None and not (isinstance(values, list) and all(isinstance(value, str) for value in values)):
+            return f'validation_json {key} must be a list of strings.'
+    return None
+
+
+class FieldValidator:
+    """The compiled checks of one field; calling it returns an error message or ``None``.
+
+    Empty answers are not checked here, ``is_required`` is enforced by the
+    submission writer.
+    """
+
+    def __init__(self, field, max_answer_length):
+        rules = field.validation_json
+        if rules_error(rules):
+            # Only the Django admin can save malformed rules; they are ignored
+            rules = {}
+        self.field_type = field.field_type
+        self.checks = []
+        self.choices = None
+        self.max_file_size = rules.get('max_file_size')
+        self.extensions = frozenset(ext.lower() for ext in rules.get('allowed_extensions') or ()) or None
+        self.content_types = frozenset(rules.get('allowed_content_types') or ()) or None
+        if field.field_type == FieldType.FILE:
+            return
+
+        self.checks.append(_max_length(rules.get('max_length') or max_answer_length))
+        if rules.get('min_length'):
+            self.checks.append(_min_length(rules['min_length']))
+        if rules.get('pattern'):
+            self.checks.append(_pattern(rules['pattern']))
+        if field.field_type == FieldType.NUMBER:
+            self.checks.append(_number_range(rules.get('min'), rules.get('max')))
+        elif field.field_type == FieldType.EMAIL:
+            self.checks.append(_django_validator(validate_email, 'Enter a valid email address.'))
+        elif field.field_type == FieldType.URL:
+            self.checks.append(_django_validator(_validate_url, 'Enter a valid URL.'))
+        elif field.field_type == FieldType.DATE:
+            self.checks.append(_date)
+        if field.field_type in CHOICE_FIELD_TYPES and field.options_json:
+            self.choices = frozenset(_option_value(option) for option in field.options_json)
+
+    def __call__(self, text, data=None):
+        for check in self.checks:
+            error = check(text)
+            if error:
+                return error
+        if self.choices is not None:
+            values = data['values'] if self.field_type == FieldType.CHECKBOX else (text,)
+            if not self.choices.issuperset(values):
+                return 'Select a valid choice.'
+        return None
+
+    def check_upload(self, uploaded_file):
+        if self.max_file_size and uploaded_file.size > self.max_file_size:
+            return f'Ensure the file is at most {self.max_file_size} bytes.'
+        if self.extensions and os.path.splitext(uploaded_file.name)[1].lower() not in self.extensions:
+            return 'This file type is not allowed.'
+        if self.content_types and uploaded_file.content_type not in self.content_types:
+            return 'This file type is not allowed.'
+        return None
+
+
+def compile_validators(fields):
+    """``{field_id: FieldValidator}`` for the answer fields of a schema."""
+    max_answer_length = getattr(settings, 'FORMS_BUILDER_MAX_ANSWER_LENGTH', 10000)
+    return {
+        field.id: FieldValidator(field, max_answer_length)
+        for field in fields if field.field_type != FieldType.PANEL
+    }
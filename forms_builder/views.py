@@ -2,30 +2,44 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse, Http404
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
-from django.urls import reverse_lazy
-from django.db.models import Count, Max, Q
-import csv
+from django.urls import reverse, reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+import hashlib
 import json
+import tempfile
+import uuid
 
-from .models import Form, FormField, FormSubmission, FormAnswer, UploadedFile, FormStatus, FieldType, FormAccess
+from .models import (
+    Form, FormField, FormSubmission, FormAnswer, ExportJob,
+    FormStatus, FieldType, FormAccess, ExportFormat, ExportStatus,
+)
 from .forms import StudentRegistrationForm, FormForm, FormUpdateForm
-from academic.models import Faculte, Domaine, Specialite
+from .submissions import SubmissionWriter, academic_columns, submission_token
+from .schema import ACADEMIC_COLUMNS, get_schema, bump_schema_version
+from .exports import export_headers, filter_submissions, iter_export_rows, stream_csv, write_excel
+from .jobs import export_filters, request_export
+from .documents import set_document_value
+from .search import index_submission, search_index_enabled
+from .roles import can_edit_admin_fields, is_form_admin
+from . import instrumentation, throttling
+from .storage import upload_url
+from .pagination import SUBMISSION_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page
+from .builder import apply_field_data, apply_operations, next_order, reorder
+from academic import hierarchy
+from academic.models import Faculte
 from django.contrib.auth.models import Group
 from django.contrib.auth import login
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
 
 
 class AdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
-        return self.request.user.is_staff or self.request.user.groups.filter(name='admin').exists()
-
-
-def is_admin(user):
-    return user.is_staff or user.groups.filter(name='admin').exists()
+        return is_form_admin(self.request)
 
 
 def home(request):
@@ -61,8 +75,8 @@ def register(request):
 
 @login_required
 def dashboard(request):
-    if is_admin(request.user):
-        forms = Form.objects.annotate(submission_count=Count('submissions'))
+    if is_form_admin(request):
+        forms = Form.objects.all()
         recent_submissions = FormSubmission.objects.filter(form__created_by=request.user)[:10]
         return render(request, 'forms_builder/dashboard.html', {
             'forms': forms,
@@ -84,7 +98,7 @@ class FormListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
     context_object_name = 'forms'
 
     def get_queryset(self):
-        return Form.objects.filter(created_by=self.request.user).annotate(submission_count=Count('submissions'))
+        return Form.objects.filter(created_by=self.request.user)
 
 
 class FormCreateView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
@@ -101,7 +115,10 @@ class FormCreateView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
 class FormUpdateView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
     model = Form
     template_name = 'forms_builder/form_edit.html'
-    fields = ['title', 'description', 'form_type', 'status', 'access_level', 'single_submission', 'allow_update', 'image']
+    fields = [
+        'title', 'description', 'form_type', 'status', 'access_level', 'single_submission', 'allow_update',
+        'submission_rate', 'submission_burst', 'image',
+    ]
     success_url = reverse_lazy('form_list')
 
     def test_func(self):
@@ -153,30 +170,14 @@ def add_field(request, form_pk):
         return JsonResponse({'error': 'Access denied'}, status=403)
     
     data = json.loads(request.body)
-    max_order = form.fields.aggregate(Max('order'))['order__max'] or 0
-    
-    field = FormField.objects.create(
-        form=form,
-        name=data.get('name', '').replace(' ', '_').lower(),
-        label=data.get('label', ''),
-        field_type=data.get('field_type', 'text'),
-        is_required=data.get('is_required', False),
-        order=max_order + 1,
-        placeholder=data.get('placeholder', ''),
-        default_value=data.get('default_value', ''),
-        options_json=data.get('options_json', []),
-        validation_json=data.get('validation_json', {}),
-        visible_condition=data.get('visible_condition', {}),
-        enabled_condition=data.get('enabled_condition', {}),
-        admin_only=data.get('admin_only', False),
-        icon=data.get('icon', ''),
-        background_color=data.get('background_color', ''),
-    )
-
-    if data.get('parent_field_id'):
-        field.parent_field_id = data['parent_field_id']
-        field.save()
+    field = FormField(form=form, order=next_order(form))
+    try:
+        apply_field_data(field, data)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    field.save()
     
+    bump_schema_version(form)
     return JsonResponse({'id': field.id, 'success': True})
 
 
@@ -190,25 +191,13 @@ def update_field(request, field_pk):
         return JsonResponse({'error': 'Access denied'}, status=403)
     
     data = json.loads(request.body)
-    
-    field.name = data.get('name', field.name).replace(' ', '_').lower()
-    field.label = data.get('label', field.label)
-    field.field_type = data.get('field_type', field.field_type)
-    field.is_required = data.get('is_required', field.is_required)
-    field.placeholder = data.get('placeholder', field.placeholder)
-    field.default_value = data.get('default_value', field.default_value)
-    field.options_json = data.get('options_json', field.options_json)
-    field.validation_json = data.get('validation_json', field.validation_json)
-    field.visible_condition = data.get('visible_condition', field.visible_condition)
-    field.enabled_condition = data.get('enabled_condition', field.enabled_condition)
-    field.admin_only = data.get('admin_only', field.admin_only)
-    field.icon = data.get('icon', field.icon)
-    field.background_color = data.get('background_color', field.background_color)
-
-    if 'parent_field_id' in data:
-        field.parent_field_id = data['parent_field_id'] or None
+    try:
+        apply_field_data(field, data)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
     field.save()
+    bump_schema_version(field.form)
     return JsonResponse({'success': True})
 
 
@@ -221,7 +210,9 @@ def delete_field(request, field_pk):
     if field.form.created_by != request.user and not request.user.is_staff:
         return JsonResponse({'error': 'Access denied'}, status=403)
     
+    form = field.form
     field.delete()
+    bump_schema_version(form)
     return JsonResponse({'success': True})
 
 
@@ -235,12 +226,33 @@ def reorder_fields(request, form_pk):
         return JsonResponse({'error': 'Access denied'}, status=403)
     
     data = json.loads(request.body)
-    for i, field_id in enumerate(data.get('field_ids', [])):
-        FormField.objects.filter(pk=field_id, form=form).update(order=i)
-
+    try:
+        with transaction.atomic():
+            reorder(form, data.get('field_ids', []))
+            bump_schema_version(form)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     return JsonResponse({'success': True})
 
 
+@login_required
+def batch_fields(request, form_pk):
+    """Apply a batch of builder operations (see ``builder.apply_operations``) at once."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    
+    form = get_object_or_404(Form, pk=form_pk)
+    if form.created_by != request.user and not request.user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    try:
+        data = json.loads(request.body)
+        version, created = apply_operations(form, data.get('operations', []) if isinstance(data, dict) else None)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'schema_version': version, 'created': created})
+
+
 @login_required
 def get_field(request, field_pk):
     field = get_object_or_404(FormField, pk=field_pk)
@@ -278,14 +290,44 @@ def get_field(request, field_pk):
     return JsonResponse(field_data)
 
 
+def _too_many_submissions(seconds=None):
+    response = HttpResponse('Too many submissions, please try again shortly.', status=429)
+    response['Retry-After'] = throttling.retry_after(seconds)
+    return response
+
+
 def form_submit_view(request, slug):
+    """Display a published form and record its submissions through ``_submit_form()``.
+
+    POSTs wait for an admission slot before any query, and each client is
+    rate limited per form.
+    """
+    if request.method != 'POST':
+        return _form_submit_view(request, slug)
+    if not throttling.admission.enter():
+        return _too_many_submissions()
+    try:
+        return _form_submit_view(request, slug)
+    finally:
+        throttling.admission.leave()
+
+
+def _form_submit_view(request, slug):
     form = get_object_or_404(Form, slug=slug, status=FormStatus.PUBLISHED)
-    fields = form.fields.all()
     
     if form.access_level == FormAccess.AUTHENTICATED and not request.user.is_authenticated:
         messages.warning(request, 'You must be logged in to submit this form.')
         return redirect(f'/login/?next=/f/{slug}/')
     
+    if request.method == 'POST':
+        wait = throttling.submission_wait(request, request.user, form)
+        if wait:
+            return _too_many_submissions(wait)
+        token = submission_token(request)
+        if token and FormSubmission.objects.filter(form=form, submission_token=token).exists():
+            # A retry of a POST that already went through
+            return redirect('form_success', slug=slug)
+    
     existing_submission = None
     if request.user.is_authenticated:
         existing_submission = FormSubmission.objects.filter(
@@ -299,121 +341,55 @@ def form_submit_view(request, slug):
     is_update = existing_submission and form.allow_update
     
     if request.method == 'POST':
-        if is_update:
-            submission = existing_submission
-            submission.answers.all().delete()
-            submission.files.all().delete()
-        else:
-            submission = FormSubmission.objects.create(
-                form=form,
-                submitted_by=request.user if request.user.is_authenticated else None,
-                ip_address=request.META.get('REMOTE_ADDR'),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
-            )
-        
-        for field in fields:
-            value = request.POST.get(f'field_{field.id}', '')
-            
-            if field.field_type == FieldType.CHECKBOX:
-                values = request.POST.getlist(f'field_{field.id}')
-                FormAnswer.objects.create(
-                    submission=submission,
-                    field=field,
-                    value_text=','.join(values),
-                    value_json={'values': values},
-                )
-            elif field.field_type == FieldType.FILE:
-                uploaded_file = request.FILES.get(f'field_{field.id}')
-                existing_file = request.POST.get(f'existing_file_{field.id}')
-                if uploaded_file:
-                    import uuid
-                    stored_name = f"{uuid.uuid4().hex}_{uploaded_file.name}"
-                    from django.conf import settings
-                    import os
-                    os.makedirs(settings.MEDIA_ROOT / 'uploads', exist_ok=True)
-                    with open(settings.MEDIA_ROOT / 'uploads' / stored_name, 'wb+') as dest:
-                        for chunk in uploaded_file.chunks():
-                            dest.write(chunk)
-                    
-                    UploadedFile.objects.create(
-                        submission=submission,
-                        field=field,
-                        original_filename=uploaded_file.name,
-                        stored_filename=stored_name,
-                        content_type=uploaded_file.content_type,
-                        size_bytes=uploaded_file.size,
-                    )
-                    FormAnswer.objects.create(
-                        submission=submission,
-                        field=field,
-                        value_text=stored_name,
-                    )
-                elif existing_file:
-                    FormAnswer.objects.create(
-                        submission=submission,
-                        field=field,
-                        value_text=existing_file,
-                    )
-            else:
-                FormAnswer.objects.create(
-                    submission=submission,
-                    field=field,
-                    value_text=value,
-                )
-        
-        if is_update:
-            messages.success(request, 'Your submission has been updated!')
-        else:
-            messages.success(request, 'Form submitted successfully!')
-        return redirect('form_success', slug=slug)
+        return _submit_form(request, form, existing_submission, is_update)
     
     prefill_data = {}
     if is_update:
         for answer in existing_submission.answers.all():
             prefill_data[answer.field_id] = answer.value_text
     
-    is_admin_user = request.user.is_authenticated and (
-        request.user.is_staff or 
-        request.user.groups.filter(name__in=['admin', 'facadmin']).exists()
-    )
-    
-    # Organize fields: panels with their children, and standalone fields
-    # First, prefetch all fields with their parent relationships
-    fields = list(form.fields.select_related('parent_field').all())
-    
-    panels = []
-    standalone_fields = []
-    panel_children = {}  # panel_id -> list of child fields
-    panel_ids = set()
-    
-    # First pass: identify all panels
-    for field in fields:
-        if field.field_type == FieldType.PANEL:
-            panels.append(field)
-            panel_ids.add(field.id)
-            panel_children[field.id] = []
-    
-    # Second pass: categorize fields
-    for field in fields:
-        if field.field_type == FieldType.PANEL:
-            continue  # Already handled
-        elif field.parent_field_id and field.parent_field_id in panel_ids:
-            panel_children[field.parent_field_id].append(field)
-        else:
-            standalone_fields.append(field)
-    
-    # Attach children to panels
-    for panel in panels:
-        panel.panel_fields = panel_children.get(panel.id, [])
+    return _render_form(request, form, get_schema(form), is_update, prefill_data)
+
+
+def _submit_form(request, form, existing_submission, is_update):
+    schema = get_schema(form)
+    writer = SubmissionWriter(form, schema, request).collect()
+    if writer.errors:
+        messages.error(request, 'Please fill in the required fields.')
+        return _render_form(request, form, schema, is_update, writer.values(), writer.errors)
+    if is_update:
+        writer.update(existing_submission)
+    else:
+        try:
+            writer.create()
+        except IntegrityError:
+            if writer.token and FormSubmission.objects.filter(form=form, submission_token=writer.token).exists():
+                # A concurrent retry of the same POST won
+                return redirect('form_success', slug=form.slug)
+            # A concurrent request already created this user's single submission
+            messages.info(request, 'You have already submitted this form.')
+            return redirect('my_submission', slug=form.slug)
     
+    if is_update:
+        messages.success(request, 'Your submission has been updated!')
+    else:
+        messages.success(request, 'Form submitted successfully!')
+    return redirect('form_success', slug=form.slug)
+
+
+def _render_form(request, form, schema, is_update, prefill_data, errors=None):
     return render(request, 'forms_builder/form_submit.html', {
         'form': form,
-        'fields': fields,
-        'panels': panels,
-        'standalone_fields': standalone_fields,
+        'fields': schema.fields,
+        'panels': schema.panels,
+        'standalone_fields': schema.standalone_fields,
         'is_update': is_update,
         'prefill_data': prefill_data,
-        'is_admin_user': is_admin_user,
+        'is_admin_user': can_edit_admin_fields(request),
+        'errors': errors or {},
+        'submission_token': uuid.uuid4(),
+        # Prefilled markup is per user; everything else is cached per schema version
+        'fragment_cache_timeout': 0 if prefill_data or errors else getattr(settings, 'FORMS_BUILDER_FORM_CACHE_TIMEOUT', 3600),
     })
 
 
@@ -435,6 +411,34 @@ def form_success(request, slug):
     return render(request, 'forms_builder/form_success.html', {'form': form})
 
 
+def _submission_page(request, form):
+    """Filter the submissions of ``form`` from the query string and return one keyset page."""
+    faculty_field_exists = get_schema(form).has_type(FieldType.SELECT_FACULTE)
+    selected_faculty = request.GET.get('faculty') if faculty_field_exists else None
+    search_query = request.GET.get('q', '').strip()
+
+    # Only the listed columns are loaded; answers are shown on the detail page
+    submissions = filter_submissions(
+        form.submissions.select_related('submitted_by').only('form', 'submitted_at', 'status', 'submitted_by__username'),
+        {'faculty': selected_faculty or '', 'q': search_query},
+    )
+    keys = ['submitted_at', 'id']
+    if search_query and search_index_enabled():
+        keys.insert(0, 'rank')
+    try:
+        size = min(int(request.GET.get('size', SUBMISSION_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        size = SUBMISSION_PAGE_SIZE
+    page, next_cursor = keyset_page(submissions, keys, request.GET.get('cursor'), max(size, 1))
+    return {
+        'submissions': page,
+        'next_cursor': next_cursor,
+        'faculty_field_exists': faculty_field_exists,
+        'selected_faculty': selected_faculty,
+        'search_query': search_query,
+    }
+
+
 @login_required
 def submission_list(request, form_pk):
     form = get_object_or_404(Form, pk=form_pk)
@@ -442,45 +446,60 @@ def submission_list(request, form_pk):
         messages.error(request, 'Access denied.')
         return redirect('form_list')
 
-    # Get all submissions with answers and fields
-    submissions = form.submissions.all().prefetch_related('answers', 'answers__field')
-
-    # Check if the form has a faculty field
-    faculty_field_exists = form.fields.filter(field_type='select_faculte').exists()
-
-    # Apply faculty filter if a faculty is selected and the form has a faculty field
-    selected_faculty = None
-    if faculty_field_exists and request.GET.get('faculty'):
-        selected_faculty = request.GET.get('faculty')
-        # Filter submissions that have an answer for a faculty field with the selected faculty ID
-        submissions = submissions.filter(answers__field__field_type='select_faculte',
-                                        answers__value_text=selected_faculty).distinct()
-
-    # Apply search filter
-    search_query = request.GET.get('q', '').strip()
-    if search_query:
-        submissions = submissions.filter(
-            Q(submitted_by__username__icontains=search_query) |
-            Q(submitted_by__first_name__icontains=search_query) |
-            Q(submitted_by__last_name__icontains=search_query) |
-            Q(submitted_by__email__icontains=search_query) |
-            Q(answers__value_text__icontains=search_query)
-        ).distinct()
+    context = _submission_page(request, form)
 
     # Get all possible faculties for this form if it has a faculty field
     faculties = []
-    if faculty_field_exists:
-        # Get all faculties from the academic app
-        from academic.models import Faculte
+    if context['faculty_field_exists']:
+        counts = dict(
+            form.submissions.filter(faculte__isnull=False)
+            .values_list('faculte_id').annotate(count=Count('id')).order_by()
+        )
         faculties = Faculte.objects.all()
+        for faculty in faculties:
+            faculty.submission_count = counts.get(faculty.id, 0)
+
+    if context['next_cursor']:
+        params = request.GET.copy()
+        params['cursor'] = context['next_cursor']
+        context['next_page_query'] = params.urlencode()
 
     return render(request, 'forms_builder/submission_list.html', {
         'form': form,
-        'submissions': submissions,
-        'faculty_field_exists': faculty_field_exists,
         'faculties': faculties,
-        'selected_faculty': selected_faculty,
-        'search_query': search_query,
+        'is_first_page': not request.GET.get('cursor'),
+        **context,
+    })
+
+
+@login_required
+def submission_list_data(request, form_pk):
+    """One page of submissions as JSON, for the incrementally loaded table."""
+    form = get_object_or_404(Form, pk=form_pk)
+    if form.created_by != request.user and not request.user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+
+    context = _submission_page(request, form)
+    next_url = None
+    if context['next_cursor']:
+        params = request.GET.copy()
+        params['cursor'] = context['next_cursor']
+        next_url = f"{request.path}?{params.urlencode()}"
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': submission.pk,
+                'submitted_at': submission.submitted_at.isoformat(),
+                'submitted_by': submission.submitted_by.username if submission.submitted_by else None,
+                'status': submission.status,
+                'status_display': submission.get_status_display(),
+                'detail_url': reverse('submission_detail', args=[submission.pk]),
+            }
+            for submission in context['submissions']
+        ],
+        'next_cursor': context['next_cursor'],
+        'next_url': next_url,
     })
 
 
@@ -492,43 +511,23 @@ def submission_detail(request, pk):
         return redirect('form_list')
 
     # Check if the current user is an admin
-    is_admin = request.user.is_staff or request.user.groups.filter(name='admin').exists()
+    is_admin = is_form_admin(request)
 
-    # Get all fields and answers for the form
-    fields = submission.form.fields.select_related('parent_field').all()
-    answers = submission.answers.all().select_related('field')
-
-    # Create a mapping of field_id to answer for easy lookup
-    answer_map = {answer.field_id: answer for answer in answers}
+    schema = get_schema(submission.form)
+    answer_map = {answer.field_id: answer for answer in submission.answers.all()}
 
-    # Organize fields: panels with their children, and standalone fields
-    panels = []
+    # Organize answers: panels with their children, and standalone answers
+    panel_answers = {panel.id: [] for panel in schema.panels}
     standalone_answers = []
-    panel_children = {}  # panel_id -> list of child answers
-    panel_ids = set()
-
-    # First pass: identify all panels
-    for field in fields:
-        if field.field_type == FieldType.PANEL:
-            panels.append(field)
-            panel_ids.add(field.id)
-            panel_children[field.id] = []
-
-    # Second pass: categorize answers
-    for answer in answers:
-        field = answer.field
-        if field.field_type == FieldType.PANEL:
-            continue  # Skip panel fields themselves
-        elif field.parent_field_id and field.parent_field_id in panel_ids:
-            # Create a tuple of (answer, field) to pass both objects
-            panel_children[field.parent_field_id].append((answer, field))
+    for field in schema.fields:
+        answer = answer_map.get(field.id)
+        if answer is None or field.field_type == FieldType.PANEL:
+            continue
+        elif field.id in schema.panel_of:
+            panel_answers[schema.panel_of[field.id]].append((answer, field))
         else:
-            # Create a tuple of (answer, field) to pass both objects
             standalone_answers.append((answer, field))
-
-    # Attach children to panels
-    for panel in panels:
-        panel.panel_answers = panel_children.get(panel.id, [])
+    panels = [(panel, panel_answers[panel.id]) for panel in schema.panels]
 
     files = submission.files.all()
     return render(request, 'forms_builder/submission_detail.html', {
@@ -546,66 +545,19 @@ def export_csv(request, form_pk):
     if form.created_by != request.user and not request.user.is_staff:
         return HttpResponse('Access denied', status=403)
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{form.slug}_submissions.csv"'
+    if request.GET.get('background'):
+        return _queue_export(request, form, ExportFormat.CSV)
 
-    writer = csv.writer(response)
-    fields = form.fields.all()
-    headers = ['Submission ID', 'Submitted At', 'Status'] + [f.label for f in fields]
-    writer.writerow(headers)
-
-    # Preload all answers and files for efficiency
-    submissions_with_data = form.submissions.prefetch_related(
-        'answers', 'files'
-    ).all()
-
-    # Apply faculty filter if provided
-    selected_faculty = request.GET.get('faculty')
-    if selected_faculty:
-        submissions_with_data = submissions_with_data.filter(
-            answers__field__field_type='select_faculte',
-            answers__value_text=selected_faculty
-        ).distinct()
-
-    # Apply search filter if provided
-    search_query = request.GET.get('q', '').strip()
-    if search_query:
-        submissions_with_data = submissions_with_data.filter(
-            Q(submitted_by__username__icontains=search_query) |
-            Q(submitted_by__first_name__icontains=search_query) |
-            Q(submitted_by__last_name__icontains=search_query) |
-            Q(submitted_by__email__icontains=search_query) |
-            Q(answers__value_text__icontains=search_query)
-        ).distinct()
-
-    for submission in submissions_with_data:
-        row = [submission.id, submission.submitted_at, submission.status]
-
-        # Create a dictionary of answers for quick lookup
-        answer_dict = {a.field_id: a.value_text for a in submission.answers.all()}
-
-        # Create a dictionary of uploaded files for quick lookup
-        file_dict = {}
-        for uploaded_file in submission.files.all():
-            file_dict[uploaded_file.field_id] = uploaded_file
-
-        # Process each field in the form
-        for field in fields:
-            if field.field_type == FieldType.FILE:
-                # For file fields, get the uploaded file and return its absolute URL
-                uploaded_file = file_dict.get(field.id)
-                if uploaded_file:
-                    # Construct the absolute URL for the file
-                    file_url = request.build_absolute_uri(f'/media/uploads/{uploaded_file.stored_filename}')
-                    row.append(file_url)
-                else:
-                    row.append('')
-            else:
-                # For non-file fields, use the answer value
-                row.append(answer_dict.get(field.id, ''))
-
-        writer.writerow(row)
+    schema = get_schema(form)
+    fields = schema.fields
+    submissions = filter_submissions(form.submissions.all(), request.GET)
 
+    # Stream the CSV in keyset-paginated chunks so memory stays flat
+    rows = iter_export_rows(
+        submissions, fields, lambda name: request.build_absolute_uri(upload_url(name)), conditions=schema.conditions
+    )
+    response = StreamingHttpResponse(stream_csv(export_headers(fields), rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{form.slug}_submissions.csv"'
     return response
 
 
@@ -615,129 +567,157 @@ def export_excel(request, form_pk):
     if form.created_by != request.user and not request.user.is_staff:
         return HttpResponse('Access denied', status=403)
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="{form.slug}_submissions.xlsx"'
+    if request.GET.get('background'):
+        return _queue_export(request, form, ExportFormat.EXCEL)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"{form.title[:31]} Submissions"  # Sheet names limited to 31 chars
+    schema = get_schema(form)
+    fields = schema.fields
+    submissions = filter_submissions(form.submissions.all(), request.GET)
 
-    # Define styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    center_alignment = Alignment(horizontal="center", vertical="center")
+    # Build the workbook in write-only mode on disk, then stream the file
+    output = tempfile.TemporaryFile()
+    rows = iter_export_rows(
+        submissions, fields, lambda name: request.build_absolute_uri(upload_url(name)), conditions=schema.conditions
+    )
+    write_excel(output, f"{form.title[:31]} Submissions", fields, rows)  # Sheet names limited to 31 chars
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{form.slug}_submissions.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
 
-    # Get all fields for headers
-    fields = form.fields.all()
-    headers = ['Submission ID', 'Submitted At', 'Status'] + [f.label for f in fields]
-
-    # Write headers
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_alignment
-
-    # Preload all answers and files for efficiency
-    submissions_with_data = form.submissions.prefetch_related(
-        'answers', 'files'
-    ).all()
-
-    # Apply faculty filter if provided
-    selected_faculty = request.GET.get('faculty')
-    if selected_faculty:
-        submissions_with_data = submissions_with_data.filter(
-            answers__field__field_type='select_faculte',
-            answers__value_text=selected_faculty
-        ).distinct()
-
-    # Apply search filter if provided
-    search_query = request.GET.get('q', '').strip()
-    if search_query:
-        submissions_with_data = submissions_with_data.filter(
-            Q(submitted_by__username__icontains=search_query) |
-            Q(submitted_by__first_name__icontains=search_query) |
-            Q(submitted_by__last_name__icontains=search_query) |
-            Q(submitted_by__email__icontains=search_query) |
-            Q(answers__value_text__icontains=search_query)
-        ).distinct()
-
-    # Write data rows
-    for row_num, submission in enumerate(submissions_with_data, 2):
-        row_data = [submission.id, submission.submitted_at, submission.status]
-
-        # Create a dictionary of answers for quick lookup
-        answer_dict = {a.field_id: a.value_text for a in submission.answers.all()}
-
-        # Create a dictionary of uploaded files for quick lookup
-        file_dict = {}
-        for uploaded_file in submission.files.all():
-            file_dict[uploaded_file.field_id] = uploaded_file
-
-        # Add field values in the same order as headers
-        for field in fields:
-            if field.field_type == FieldType.FILE:
-                # For file fields, get the uploaded file and return its absolute URL
-                uploaded_file = file_dict.get(field.id)
-                if uploaded_file:
-                    # Construct the absolute URL for the file
-                    file_url = request.build_absolute_uri(f'/media/uploads/{uploaded_file.stored_filename}')
-                    row_data.append(file_url)
-                else:
-                    row_data.append('')
-            else:
-                # For non-file fields, use the answer value
-                row_data.append(answer_dict.get(field.id, ''))
-
-        for col_num, value in enumerate(row_data, 1):
-            ws.cell(row=row_num, column=col_num, value=str(value) if value is not None else '')
-
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-
-        adjusted_width = min(max_length + 2, 50)  # Limit max width to 50
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-    wb.save(response)
+
+def _export_job_data(job):
+    data = {
+        'id': job.id,
+        'status': job.status,
+        'rows_done': job.rows_done,
+        'rows_total': job.rows_total,
+        'status_url': reverse('export_job_status', kwargs={'pk': job.pk}),
+        'error': job.error,
+    }
+    if job.status == ExportStatus.DONE:
+        data['download_url'] = reverse('export_job_download', kwargs={'pk': job.pk})
+    return data
+
+
+def _queue_export(request, form, export_format):
+    job = request_export(
+        form,
+        export_format,
+        export_filters(request.GET),
+        request.user,
+        request.build_absolute_uri('/'),
+    )
+    return JsonResponse(_export_job_data(job), status=200 if job.status == ExportStatus.DONE else 202)
+
+
+@login_required
+def export_job_status(request, pk):
+    job = get_object_or_404(ExportJob.objects.select_related('form'), pk=pk)
+    if job.form.created_by != request.user and not request.user.is_staff:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    return JsonResponse(_export_job_data(job))
+
+
+@login_required
+def export_job_download(request, pk):
+    job = get_object_or_404(ExportJob.objects.select_related('form'), pk=pk, status=ExportStatus.DONE)
+    if job.form.created_by != request.user and not request.user.is_staff:
+        return HttpResponse('Access denied', status=403)
+    return FileResponse(
+        job.file.open('rb'),
+        as_attachment=True,
+        filename=f'{job.form.slug}_submissions.{job.export_format}',
+    )
+
+
+def _conditional(request, etag, last_modified, build_response):
+    """Return ``build_response()``, or 304 if the client already has this ``etag``."""
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified.timestamp())
+    if response is None:
+        response = build_response()
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, no_cache=True)
     return response
 
 
+def _conditional_json(request, data, version_key, last_modified):
+    """Return ``data`` as JSON, or 304 if the client already has this ``version_key``."""
+    return _conditional(
+        request,
+        hashlib.sha1(version_key.encode()).hexdigest(),
+        last_modified,
+        lambda: JsonResponse(data, safe=False),
+    )
+
+
+def _tree_json(request, rows):
+    """JSON response of ``rows(tree)``, revalidated against the academic tree ETag."""
+    tree = hierarchy.get_tree()
+    return _conditional(request, tree['etag'], tree['last_modified'], lambda: JsonResponse(rows(tree), safe=False))
+
+
 def api_facultes(request):
-    facultes = Faculte.objects.all().values('id', 'nom')
-    return JsonResponse(list(facultes), safe=False)
+    return _tree_json(request, hierarchy.facultes)
 
 
 def api_domaines(request):
     faculte_id = request.GET.get('faculte_id')
-    domaines = Domaine.objects.all()
-    if faculte_id:
-        domaines = domaines.filter(faculte_id=faculte_id)
-    return JsonResponse(list(domaines.values('id', 'nom', 'faculte_id')), safe=False)
+    return _tree_json(request, lambda tree: hierarchy.domaines(faculte_id, tree))
 
 
 def api_specialites(request):
     domaine_id = request.GET.get('domaine_id')
-    specialites = Specialite.objects.all()
-    if domaine_id:
-        specialites = specialites.filter(domaine_id=domaine_id)
-    return JsonResponse(list(specialites.values('id', 'nom', 'domaine_id')), safe=False)
+    return _tree_json(request, lambda tree: hierarchy.specialites(domaine_id, tree))
+
+
+def api_academic_tree(request):
+    """The whole academic hierarchy in one payload, as ``[id, nom, parent_id]`` rows."""
+    tree = hierarchy.get_tree()
+    return _conditional(
+        request, tree['etag'], tree['last_modified'],
+        lambda: HttpResponse(tree['payload'], content_type='application/json'),
+    )
+
+
+def _child_options_schema(field_pk):
+    form = get_object_or_404(Form.objects.only('schema_version', 'updated_at'), fields__pk=field_pk)
+    schema = get_schema(form)
+    if field_pk not in schema.by_id:
+        raise Http404('No FormField matches the given query.')
+    return form, schema
 
 
 def api_child_options(request, field_pk):
     parent_value = request.GET.get('parent_value', '')
-    field = get_object_or_404(FormField, pk=field_pk)
+    form, schema = _child_options_schema(field_pk)
+    return _conditional_json(
+        request,
+        list(schema.options_for(field_pk, parent_value)),
+        f'{form.pk}.{schema.version}.{field_pk}.{parent_value}',
+        form.updated_at,
+    )
 
-    options = [opt for opt in field.options_json if opt.get('parentValue') == parent_value]
-    return JsonResponse(options, safe=False)
+
+def api_child_options_bulk(request, field_pk):
+    """Options for several ``parent_value`` parameters at once, keyed by parent value."""
+    parent_values = request.GET.getlist('parent_value')
+    form, schema = _child_options_schema(field_pk)
+    if parent_values:
+        data = {value: list(schema.options_for(field_pk, value)) for value in parent_values}
+    else:
+        data = {value: list(options) for value, options in schema.child_options.get(field_pk, {}).items()}
+    return _conditional_json(
+        request,
+        data,
+        f"{form.pk}.{schema.version}.{field_pk}.{'|'.join(sorted(parent_values))}",
+        form.updated_at,
+    )
 
 
 @login_required
@@ -764,6 +744,23 @@ def update_answer(request, pk, answer_id):
 
     answer.value_text = new_value
     answer.save()
+    set_document_value(answer.submission_id, answer.field_id, new_value)
+    if answer.field.field_type in ACADEMIC_COLUMNS:
+        columns = academic_columns([(answer.field.field_type, new_value)])
+        column = ACADEMIC_COLUMNS[answer.field.field_type][0]
+        FormSubmission.objects.filter(pk=answer.submission_id).update(**{column: columns[column]})
+    answer.submission.save(update_fields=['updated_at'])
+    index_submission(answer.submission_id)
 
     messages.success(request, f'Updated {answer.field.label} successfully!')
     return redirect('submission_detail', pk=pk)
+
+
+@login_required
+def metrics(request):
+    """Per-view request and SQL aggregates of this process, for Prometheus."""
+    if not instrumentation.enabled():
+        raise Http404
+    if not request.user.is_staff:
+        return HttpResponse('Access denied', status=403)
+    return HttpResponse(instrumentation.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
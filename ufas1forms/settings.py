@@ -26,11 +26,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'forms_builder.instrumentation.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'forms_builder.roles.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -105,3 +107,90 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
+
+# The cache must be shared by every worker process: the academic tree, role
+# versions and submission rate limits are invalidated or counted through it,
+# and the hot paths read it on every request, so it has to be fast too.
+# Without a Redis server, fall back to the database cache below: it is
+# shared but costs a query per lookup, and needs `manage.py createcachetable`
+# (run by deploy.sh).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
+}
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+#         'LOCATION': 'forms_builder_cache',
+#         'OPTIONS': {'MAX_ENTRIES': 100000},
+#     },
+# }
+
+# Export artifacts contain every answer and are downloaded through an access
+# check, so they live outside MEDIA_ROOT (which the web server serves as is)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'exports': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': BASE_DIR / 'private', 'base_url': None},
+    },
+}
+
+# Seconds the academic hierarchy stays cached; saves and deletes through the
+# ORM invalidate it at once, this bounds staleness after bulk updates or loaddata
+ACADEMIC_TREE_CACHE_TIMEOUT = 3600
+
+# Forms builder
+# Read exports and search from FormSubmission.answer_document instead of the
+# FormAnswer join (run `manage.py backfill_answer_documents` first)
+FORMS_BUILDER_READ_ANSWER_DOCUMENTS = False
+
+# Seconds a user's group names stay cached in their session (group changes
+# invalidate them immediately)
+FORMS_BUILDER_ROLE_CACHE_TTL = 300
+
+# Seconds each process trusts its copy of the role versions before reading the
+# shared cache again, i.e. how late other processes may see a group change
+FORMS_BUILDER_ROLE_VERSION_TTL = 10
+
+# Seconds a form's compiled fields stay in the shared cache; schema changes
+# bump the form's schema_version, so stale entries are never read
+FORMS_BUILDER_SCHEMA_CACHE_TIMEOUT = 3600
+
+# Seconds the rendered field markup of a published form stays cached; 0 disables it
+FORMS_BUILDER_FORM_CACHE_TIMEOUT = 3600
+
+# STORAGES alias holding uploaded FILE answers (content-addressed under uploads/)
+FORMS_BUILDER_UPLOAD_STORAGE = 'default'
+
+# Longest accepted answer, in characters, for fields without a validation_json max_length
+FORMS_BUILDER_MAX_ANSWER_LENGTH = 10000
+
+# Record per-request SQL counts and timings (Server-Timing header and the
+# staff-only /metrics/ endpoint); off removes the middleware entirely
+FORMS_BUILDER_INSTRUMENTATION = False
+
+# Requests per view kept for the latency and query-count quantiles of /metrics/
+FORMS_BUILDER_INSTRUMENTATION_WINDOW = 1000
+
+# Submissions handled at once per process; 0 disables the limit (per-form
+# rate limits are set on each form, and are off by default)
+FORMS_BUILDER_MAX_ACTIVE_SUBMISSIONS = 64
+
+# Submissions over that limit waiting for a slot, and for how many seconds,
+# before further ones get a 429
+FORMS_BUILDER_SUBMISSION_QUEUE = 256
+FORMS_BUILDER_SUBMISSION_QUEUE_TIMEOUT = 10
+
+# Retry-After, in seconds, sent with submissions refused by the queue above
+FORMS_BUILDER_SUBMISSION_RETRY_AFTER = 5
+
+# STORAGES alias holding export artifacts; it must not be publicly served
+FORMS_BUILDER_EXPORT_STORAGE = 'exports'
+
+# Seconds a finished export job and its artifact are kept (run_export_worker
+# also deletes artifacts superseded by a newer export of the same data)
+FORMS_BUILDER_EXPORT_RETENTION = 86400